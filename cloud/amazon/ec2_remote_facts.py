@@ -38,14 +38,35 @@ options:
     default: tags
   region:
     description:
-      - EC2 region that it should look for tags in
+      - EC2 region that it should look for tags in. Since 2.1 this can be a list of regions.
     required: false
     default: All Regions
   ignore_state:
     description:
-      - instance state that should be ignored such as terminated.
+      - instance state that should be ignored such as terminated. Since 2.1 this can be a list of states,
+        which are filtered out by EC2 rather than by the module.
     required: false
     default: terminated
+  workers:
+    description:
+      - Number of regions queried at the same time.
+    required: false
+    default: 1
+    version_added: "2.1"
+  page_size:
+    description:
+      - Number of instances fetched per request.
+    required: false
+    default: 1000
+    version_added: "2.1"
+  attributes:
+    description:
+      - Instance attributes to return, such as C(id), C(private_ip_address), C(tags) or C(placement).
+        Each instance is then returned as a flat dictionary of these attributes instead of the full dump
+        of the boto instance object. Nested attributes can be given with dots, such as C(state_reason.code).
+    required: false
+    default: null
+    version_added: "2.1"
 author:
     - "Michael Schuett (@michaeljs1990)"
 extends_documentation_fragment: aws
@@ -59,7 +80,31 @@ EXAMPLES = '''
     key: mykey
     value: myvalue
   register: servers
+
+# Query two regions at once, only returning a few attributes of the running instances
+- ec2_remote_facts:
+    key: role
+    value: web
+    region:
+      - us-east-1
+      - eu-west-1
+    ignore_state:
+      - pending
+      - shutting-down
+      - terminated
+      - stopping
+      - stopped
+    workers: 2
+    attributes:
+      - id
+      - hostname
+      - private_ip_address
+      - tags
+  register: servers
 '''
+import Queue
+import threading
+
 try:
     import boto
     import boto.ec2
@@ -67,6 +112,8 @@ try:
 except ImportError:
     HAS_BOTO = False
 
+INSTANCE_STATES = ['pending', 'running', 'shutting-down', 'terminated', 'stopping', 'stopped']
+
 def todict(obj, classkey=None):
     if isinstance(obj, dict):
         data = {}
@@ -90,58 +137,134 @@ def todict(obj, classkey=None):
     else:
         return obj
 
+def flatten(value):
+    """Returns value as plain data, referring to other boto objects by their id or name."""
+    if value is None or isinstance(value, (basestring, bool, int, long, float)):
+        return value
+    if isinstance(value, dict):
+        return dict((k, flatten(v)) for (k, v) in value.items())
+    if isinstance(value, (list, tuple)):
+        return [flatten(v) for v in value]
+    for key in ('id', 'name'):
+        if getattr(value, key, None) is not None:
+            return getattr(value, key)
+    return str(value)
+
+def project(instance, attributes):
+    data = {}
+    for attribute in attributes:
+        value = instance
+        for part in attribute.split('.'):
+            value = getattr(value, part, None)
+        data[attribute] = flatten(value)
+    return data
+
 def get_all_ec2_regions(module):
     try:
         regions = boto.ec2.regions()
     except Exception, e:
-        module.fail_json('Boto authentication issue: %s' % e)
+        module.fail_json(msg='Boto authentication issue: %s' % e)
 
-    return regions
+    return [region.name for region in regions]
 
 # Connect to ec2 region
-def connect_to_region(region, module):
+def connect_to_region(region):
     try:
-        conn = boto.ec2.connect_to_region(region.name)
-    except Exception, e:
-        print module.jsonify('error connecting to region: ' + region.name)
+        conn = boto.ec2.connect_to_region(region)
+    except Exception:
         conn = None
     # connect_to_region will fail "silently" by returning
     # None if the region name is wrong or not supported
     return conn
 
+def get_region_instances(region, module):
+    """Returns the facts of the matching instances of one region."""
+    conn = connect_to_region(region)
+    if conn is None:
+        raise Exception('error connecting to region: ' + region)
+
+    server_info = list()
+    # Run when looking up by tag names, only returning hostname currently
+    if module.params.get('lookup') == 'tags':
+        filters = {'tag:' + module.params.get('key'): module.params.get('value')}
+        ignore_state = module.params.get('ignore_state') or []
+        states = [state for state in INSTANCE_STATES if state not in ignore_state]
+        if len(states) < len(INSTANCE_STATES):
+            filters['instance-state-name'] = states
+        attributes = module.params.get('attributes')
+
+        next_token = None
+        while True:
+            reservations = conn.get_all_reservations(filters=filters, max_results=module.params.get('page_size'),
+                                                     next_token=next_token)
+            for instance in [i for r in reservations for i in r.instances]:
+                if instance.private_ip_address != None:
+                    instance.hostname = 'ip-' + instance.private_ip_address.replace('.', '-')
+                if attributes:
+                    server_info.append(project(instance, attributes))
+                else:
+                    server_info.append(todict(instance))
+            next_token = getattr(reservations, 'next_token', None)
+            if not next_token:
+                break
+    return server_info
+
+def get_all_instances(regions, module):
+    """Queries the regions on a pool of workers, returns the instances in region order and the failed regions."""
+    results = dict()
+    errors = dict()
+    work = Queue.Queue()
+    for region in regions:
+        work.put(region)
+
+    def worker():
+        while True:
+            try:
+                region = work.get_nowait()
+            except Queue.Empty:
+                break
+            try:
+                results[region] = get_region_instances(region, module)
+            except Exception, e:
+                errors[region] = str(e)
+
+    threads = []
+    for i in range(max(1, min(module.params.get('workers'), len(regions)))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    server_info = list()
+    for region in regions:
+        server_info.extend(results.get(region, []))
+    return server_info, errors
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
             key = dict(default='Name'),
             value = dict(),
             lookup = dict(default='tags'),
-            ignore_state = dict(default='terminated'),
-            region = dict(),
+            ignore_state = dict(default=['terminated'], type='list'),
+            region = dict(type='list'),
+            workers = dict(default=1, type='int'),
+            page_size = dict(default=1000, type='int'),
+            attributes = dict(type='list'),
         )
     )
 
     if not HAS_BOTO:
         module.fail_json(msg='boto required for this module')
 
-    server_info = list()
-
-    for region in get_all_ec2_regions(module):
-        conn = connect_to_region(region, module)
-        try:
-            # Run when looking up by tag names, only returning hostname currently
-            if module.params.get('lookup') == 'tags':
-                ec2_key = 'tag:' + module.params.get('key')
-                ec2_value = module.params.get('value')
-                reservations = conn.get_all_instances(filters={ec2_key : ec2_value})
-                for instance in [i for r in reservations for i in r.instances]:
-                    if instance.private_ip_address != None:
-                        instance.hostname = 'ip-' + instance.private_ip_address.replace('.', '-')
-                    if instance._state.name not in module.params.get('ignore_state'):
-                        server_info.append(todict(instance))
-        except:
-            print module.jsonify('error getting instances from: ' + region.name)
+    regions = module.params.get('region') or get_all_ec2_regions(module)
+    server_info, region_errors = get_all_instances(regions, module)
 
     ec2_facts_result = dict(changed=True, ec2=server_info)
+    if region_errors:
+        ec2_facts_result['region_errors'] = region_errors
 
     module.exit_json(**ec2_facts_result)
 
@@ -58,11 +58,74 @@ try:
     from boto import route53
     from boto.route53 import Route53Connection
     from boto.route53.zone import Zone
+    from boto.route53.exception import DNSServerError
+    import boto.jsonresponse
     HAS_BOTO = True
 except ImportError:
     HAS_BOTO = False
 
 
+class ZoneIndex(object):
+    """
+    Hosted zones of the account by name, looked up with
+    ListHostedZonesByName so that only the zones with the requested name
+    are listed, instead of every zone in the account. Listings and zone
+    details are cached for the run.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._zones = {}
+        self._details = {}
+        self._all_zones = None
+
+    def _list_by_name(self, name):
+        zones = []
+        params = {'dnsname': name, 'maxitems': str(self.PAGE_SIZE)}
+        while True:
+            response = self.conn.make_request('GET', '/%s/hostedzonesbyname' % self.conn.Version, params=params)
+            body = response.read()
+            if response.status >= 300:
+                raise DNSServerError(response.status, response.reason, body)
+            e = boto.jsonresponse.Element(list_marker='HostedZones', item_marker=('HostedZone',))
+            h = boto.jsonresponse.XmlHandler(e, None)
+            h.parse(body)
+            result = e['ListHostedZonesByNameResponse']
+
+            # the listing is sorted by name and starts at the requested one
+            for r53zone in result['HostedZones']:
+                if r53zone['Name'] != name:
+                    return zones
+                zones.append(r53zone)
+            if result.get('IsTruncated') != 'true' or result.get('NextDNSName') != name:
+                return zones
+            params = {'dnsname': name, 'hostedzoneid': result['NextHostedZoneId'],
+                      'maxitems': str(self.PAGE_SIZE)}
+
+    def _list_all(self, name):
+        # get_all_hosted_zones follows the pagination of the listing
+        if self._all_zones is None:
+            self._all_zones = self.conn.get_all_hosted_zones()['ListHostedZonesResponse']['HostedZones']
+        return [r53zone for r53zone in self._all_zones if r53zone['Name'] == name]
+
+    def zones(self, name):
+        """Hosted zones named name."""
+        if name not in self._zones:
+            try:
+                self._zones[name] = self._list_by_name(name)
+            except DNSServerError:
+                # endpoints or policies without ListHostedZonesByName
+                self._zones[name] = self._list_all(name)
+        return self._zones[name]
+
+    def details(self, zone_id):
+        if zone_id not in self._details:
+            self._details[zone_id] = self.conn.get_hosted_zone(zone_id)
+        return self._details[zone_id]
+
+
 def main():
     argument_spec = ec2_argument_spec()
     argument_spec.update(dict(
@@ -92,13 +155,17 @@ def main():
     except boto.exception.BotoServerError, e:
         module.fail_json(msg=e.error_message)
 
-    results = conn.get_all_hosted_zones()
+    index = ZoneIndex(conn)
     zones = {}
 
-    for r53zone in results['ListHostedZonesResponse']['HostedZones']:
+    for r53zone in index.zones(zone_in):
         zone_id = r53zone['Id'].replace('/hostedzone/', '')
-        zone_details = conn.get_hosted_zone(zone_id)['GetHostedZoneResponse']
-        if vpc_id and 'VPCs' in zone_details:
+        if not vpc_id or r53zone.get('Config', {}).get('PrivateZone') == 'false':
+            # only private zones have VPCs to check
+            zones[r53zone['Name']] = zone_id
+            continue
+        zone_details = index.details(zone_id)['GetHostedZoneResponse']
+        if 'VPCs' in zone_details:
             # this is to deal with this boto bug: https://github.com/boto/boto/pull/2882
             if isinstance(zone_details['VPCs'], dict):
                 if zone_details['VPCs']['VPC']['VPCId'] == vpc_id:
@@ -118,7 +185,7 @@ def main():
 
     if state == 'present' and zone_in in zones:
         if private_zone:
-            details = conn.get_hosted_zone(zones[zone_in])
+            details = index.details(zones[zone_in])
 
             if 'VPCs' not in details['GetHostedZoneResponse']:
                 module.fail_json(
@@ -144,6 +144,22 @@ options:
       - Password for the administrator / root user
     default: None
     required: False
+  pipeline:
+    description:
+      - Whether to provision each new server independently. Every server goes through create, wait, public ip and
+        alert policy on its own, without waiting for the other servers, on a pool of I(pipeline_workers) threads.
+      - A server failing any step is reported in C(failed_servers) with the step it failed at, the other servers
+        are still provisioned.
+    default: False
+    required: False
+    choices: [True, False]
+    version_added: "2.1"
+  pipeline_workers:
+    description:
+      - The number of servers provisioned at the same time if I(pipeline) is set to True.
+    default: 10
+    required: False
+    version_added: "2.1"
   primary_dns:
     description:
       - Primary DNS used by the server.
@@ -238,6 +254,17 @@ EXAMPLES = '''
     group: 'Default Group'
     state: present
 
+- name: Provision 50 Ubuntu Servers, each as fast as it can be
+  clc_server:
+    name: test
+    template: ubuntu-14-64
+    count: 50
+    add_public_ip: True
+    public_ip_ports: [22]
+    pipeline: True
+    pipeline_workers: 20
+    state: present
+
 - name: Ensure 'Default Group' has exactly 5 servers
   clc_server:
     name: test
@@ -264,6 +291,8 @@ EXAMPLES = '''
 
 __version__ = '${version}'
 
+import Queue
+import threading
 from time import sleep
 from distutils.version import LooseVersion
 
@@ -289,6 +318,34 @@ else:
     CLC_FOUND = True
 
 
+class ClcServerPipelineError(Exception):
+    """
+    Raised in place of fail_json for a single server of a pipelined run
+    """
+
+    def __init__(self, stage, msg):
+        Exception.__init__(self, msg)
+        self.stage = stage
+        self.msg = msg
+
+
+class ClcPipelineModule(object):
+    """
+    Stands in for the AnsibleModule in the pipeline worker threads, so that
+    a failure fails the one server being provisioned instead of exiting
+    """
+
+    def __init__(self, module):
+        self._module = module
+        self.stage = None
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def fail_json(self, **kwargs):
+        raise ClcServerPipelineError(self.stage, kwargs.get('msg'))
+
+
 class ClcServer:
     clc = clc_sdk
 
@@ -299,6 +356,7 @@ class ClcServer:
         self.clc = clc_sdk
         self.module = module
         self.group_dict = {}
+        self.failed_servers = []
 
         if not CLC_FOUND:
             self.module.fail_json(
@@ -382,6 +440,7 @@ class ClcServer:
             changed=changed,
             server_ids=new_server_ids,
             partially_created_server_ids=partial_servers_ids,
+            failed_servers=self.failed_servers,
             servers=server_dict_array)
 
     @staticmethod
@@ -440,6 +499,8 @@ class ClcServer:
                     'UDP',
                     'ICMP']),
             public_ip_ports=dict(type='list', default=[]),
+            pipeline=dict(type='bool', default=False),
+            pipeline_workers=dict(type='int', default=10),
             wait=dict(type='bool', default=True))
 
         mutually_exclusive = [
@@ -802,6 +863,8 @@ class ClcServer:
 
         if not changed:
             return server_dict_array, created_server_ids, partial_created_servers_ids, changed
+        if p.get('pipeline') and not module.check_mode:
+            return self._create_servers_pipelined(module, clc, params, count)
         for i in range(0, count):
             if not module.check_mode:
                 req = self._create_clc_server(clc=clc,
@@ -841,6 +904,132 @@ class ClcServer:
 
         return server_dict_array, created_server_ids, partial_created_servers_ids, changed
 
+    def _create_servers_pipelined(self, module, clc, params, count):
+        """
+        Create New Servers in CLC cloud, each server going through all the
+        provisioning steps independently on a bounded pool of threads
+        :param module: the AnsibleModule object
+        :param clc: the clc-sdk instance to use
+        :param params: the server parameters for _create_clc_server
+        :param count: the number of servers to create
+        :return: a list of dictionaries with server information about the servers that were created
+        """
+        work = Queue.Queue()
+        for i in range(0, count):
+            work.put(i)
+        results = [None] * count
+
+        def worker():
+            while True:
+                try:
+                    i = work.get_nowait()
+                except Queue.Empty:
+                    return
+                results[i] = self._provision_server(module, clc, params)
+
+        threads = []
+        for i in range(0, min(max(module.params.get('pipeline_workers'), 1), count)):
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        server_dict_array = []
+        created_server_ids = []
+        partial_created_servers_ids = []
+        fatal = False
+        for server, error in results:
+            if error:
+                self.failed_servers.append({
+                    'server_id': server and server.id,
+                    'stage': error.stage,
+                    'msg': error.msg})
+                fatal = fatal or error.stage in ('create', 'wait', 'refresh')
+                if server:
+                    partial_created_servers_ids.append(server.id)
+                    server_dict_array.append(server.data)
+            else:
+                created_server_ids.append(server.id)
+                server_dict_array.append(server.data)
+
+        if fatal:
+            module.fail_json(
+                msg='Unable to provision {0} of {1} servers'.format(
+                    len(self.failed_servers), count),
+                server_ids=created_server_ids,
+                partially_created_server_ids=partial_created_servers_ids,
+                failed_servers=self.failed_servers,
+                servers=server_dict_array)
+        return server_dict_array, created_server_ids, partial_created_servers_ids, True
+
+    def _provision_server(self, module, clc, params):
+        """
+        Take a single new server through create, wait, public ip and alert
+        policy, stopping at the first step that fails
+        :param module: the AnsibleModule object
+        :param clc: the clc-sdk instance to use
+        :param params: the server parameters for _create_clc_server
+        :return: a tuple of the clc-sdk.Server (None if it wasn't created)
+                 and the ClcServerPipelineError it failed with, or None
+        """
+        p = module.params
+        pmodule = ClcPipelineModule(module)
+        server = None
+        try:
+            pmodule.stage = 'create'
+            request = self._create_clc_server(clc=clc,
+                                              module=pmodule,
+                                              server_params=params)
+            server = request.requests[0].Server()
+
+            pmodule.stage = 'wait'
+            if p.get('wait') and request.WaitUntilComplete() > 0:
+                pmodule.fail_json(msg='Unable to process server request')
+
+            if p.get('add_public_ip'):
+                pmodule.stage = 'public_ip'
+                ports_lst = [{'protocol': p.get('public_ip_protocol'), 'port': port}
+                             for port in p.get('public_ip_ports')]
+                try:
+                    request = server.PublicIPs().Add(ports_lst)
+                except APIFailedResponse as ex:
+                    pmodule.fail_json(msg='Unable to add a public ip to the server {0}. {1}'.format(
+                        server.id, ex.response_text))
+                if p.get('wait') and request.WaitUntilComplete() > 0:
+                    pmodule.fail_json(msg='Unable to process public ip request')
+
+            if p.get('alert_policy_id'):
+                pmodule.stage = 'alert_policy'
+                try:
+                    self._add_alert_policy_to_server(clc=clc,
+                                                     alias=p.get('alias'),
+                                                     server_id=server.id,
+                                                     alert_policy_id=p.get('alert_policy_id'))
+                except CLCException as ex:
+                    pmodule.fail_json(msg=ex.message)
+
+            # one refresh picks up the addresses of all the steps above
+            pmodule.stage = 'refresh'
+            try:
+                server.Refresh()
+            except CLCException as ex:
+                pmodule.fail_json(msg='Unable to refresh the server {0}. {1}'.format(
+                    server.id, ex.message))
+            server.data['ipaddress'] = server.details[
+                'ipAddresses'][0]['internal']
+            if p.get('add_public_ip'):
+                public_ips = server.PublicIPs().public_ips
+                if len(public_ips) > 0:
+                    server.data['publicip'] = str(public_ips[0])
+        except ClcServerPipelineError as ex:
+            return server, ex
+        except Exception as ex:
+            # anything else must not take the worker thread down with it
+            return server, ClcServerPipelineError(pmodule.stage, str(ex))
+        return server, None
+
     def _enforce_count(self, module, clc):
         """
         Enforce that there is the right number of servers in the provided group.
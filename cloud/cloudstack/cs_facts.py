@@ -41,6 +41,21 @@ options:
       - cloudstack_local_ipv4
       - cloudstack_instance_id
       - cloudstack_user_data
+  cache_path:
+    description:
+      - File to keep the gathered facts in. Facts are read from it instead of the metadata API while they are
+        younger than C(cache_ttl) and the dhclient leases file has not changed since, i.e. the instance has not
+        got a new lease or DHCP server.
+      - Without a cache, all facts are still fetched concurrently.
+    required: false
+    default: null
+    version_added: "2.1"
+  cache_ttl:
+    description:
+      - Seconds the facts in C(cache_path) are used for.
+    required: false
+    default: 300
+    version_added: "2.1"
 requirements: [ 'yaml' ]
 '''
 
@@ -52,6 +67,10 @@ EXAMPLES = '''
 # Gather specific fact on instances
 - name: Gather cloudstack facts
   cs_facts: filter=cloudstack_instance_id
+
+# Gather facts at most every 10 minutes, or when the DHCP lease changes
+- name: Gather cloudstack facts
+  cs_facts: cache_path=/var/cache/ansible/cs_facts.json cache_ttl=600
 '''
 
 RETURN = '''
@@ -98,7 +117,15 @@ cloudstack_user_data:
   sample: { "bla": "foo" }
 '''
 
+import httplib
+import json
 import os
+import Queue
+import socket
+import tempfile
+import threading
+import time
+import urlparse
 
 try:
     import yaml
@@ -108,6 +135,9 @@ except ImportError:
 
 CS_METADATA_BASE_URL = "http://%s/latest/meta-data"
 CS_USERDATA_BASE_URL = "http://%s/latest/user-data"
+# concurrent connections to the metadata API, each reused for several paths
+CS_METADATA_WORKERS = 4
+CS_METADATA_TIMEOUT = 10
 
 class CloudStackFacts(object):
 
@@ -127,22 +157,147 @@ class CloudStackFacts(object):
     def run(self):
         result = {}
         filter = module.params.get('filter')
-        if not filter:
-            for key,path in self.fact_paths.iteritems():
-                result[key] = self._fetch(CS_METADATA_BASE_URL + "/" + path)
-            result['cloudstack_user_data'] = self._get_user_data_json()
+        cache_path = module.params.get('cache_path')
+
+        facts = self._load_cache()
+        if facts is None:
+            if filter and not cache_path:
+                if filter == 'cloudstack_user_data':
+                    result['cloudstack_user_data'] = self._get_user_data_json()
+                elif filter in self.fact_paths:
+                    result[filter] = self._fetch(CS_METADATA_BASE_URL + "/" + self.fact_paths[filter])
+                return result
+            facts = self._fetch_all()
+            self._save_cache(facts)
+
+        if filter:
+            result[filter] = facts.get(filter)
         else:
-            if filter == 'cloudstack_user_data':
-                result['cloudstack_user_data'] = self._get_user_data_json()
-            elif filter in self.fact_paths:
-                result[filter] = self._fetch(CS_METADATA_BASE_URL + "/" + self.fact_paths[filter])
+            result = facts
         return result
 
 
+    def _fetch_all(self):
+        """Fetch every fact from the metadata API concurrently."""
+        urls = {}
+        for key, path in self.fact_paths.iteritems():
+            urls[key] = CS_METADATA_BASE_URL + "/" + path
+        urls['cloudstack_user_data'] = CS_USERDATA_BASE_URL
+
+        result = self._fetch_concurrent(urls)
+        result['cloudstack_user_data'] = self._parse_user_data(result['cloudstack_user_data'])
+        return result
+
+
+    def _fetch_concurrent(self, urls):
+        """Fetch a dict of URLs, each worker keeping its connection alive."""
+        results = dict((key, None) for key in urls)
+        api_ip = self._get_api_ip()
+        if not api_ip:
+            return results
+
+        work = Queue.Queue()
+        for key, url in urls.iteritems():
+            work.put((key, urlparse.urlparse(url % api_ip)))
+
+        def worker():
+            conn = None
+            while True:
+                try:
+                    key, url = work.get_nowait()
+                except Queue.Empty:
+                    break
+                # a kept alive connection may have been closed by the server,
+                # so retry once on a fresh one
+                for attempt in range(2):
+                    try:
+                        if conn is None:
+                            conn = httplib.HTTPConnection(url.netloc, timeout=CS_METADATA_TIMEOUT)
+                        conn.request('GET', url.path)
+                        response = conn.getresponse()
+                        data = response.read()
+                        if response.status == 200:
+                            results[key] = data
+                        break
+                    except (httplib.HTTPException, socket.error):
+                        if conn is not None:
+                            conn.close()
+                        conn = None
+            if conn is not None:
+                conn.close()
+
+        threads = []
+        for i in range(min(CS_METADATA_WORKERS, len(urls))):
+            t = threading.Thread(target=worker)
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        return results
+
+
+    def _lease_mtime(self):
+        return os.path.getmtime(self._get_dhcp_lease_file())
+
+
+    def _load_cache(self):
+        """Return the cached facts, or None if there are none still valid."""
+        cache_path = module.params.get('cache_path')
+        if not cache_path:
+            return None
+        try:
+            cache = json.load(open(os.path.expanduser(cache_path)))
+        except (IOError, ValueError):
+            return None
+
+        if cache.get('lease_mtime') != self._lease_mtime():
+            return None
+        # the lease is unchanged, so is the DHCP server we got it from
+        self.api_ip = cache.get('api_ip')
+        if time.time() - cache.get('time', 0) > module.params.get('cache_ttl'):
+            return None
+        return cache.get('facts')
+
+
+    def _save_cache(self, facts):
+        cache_path = module.params.get('cache_path')
+        if not cache_path:
+            return
+        cache_path = os.path.expanduser(cache_path)
+        tmp = None
+        try:
+            cache = {
+                'time': time.time(),
+                'lease_mtime': self._lease_mtime(),
+                'api_ip': self._get_api_ip(),
+                'facts': facts,
+            }
+            dirname = os.path.dirname(cache_path) or '.'
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            # user data may hold secrets, mkstemp creates the file 0600
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(cache, f)
+            finally:
+                f.close()
+            os.rename(tmp, cache_path)
+        except (IOError, OSError):
+            # the cache only saves time, failing to write it is no error
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+
+
     def _get_user_data_json(self):
+        return self._parse_user_data(self._fetch(CS_USERDATA_BASE_URL))
+
+
+    def _parse_user_data(self, data):
         try:
             # this data come form users, we try what we can to parse it...
-            return yaml.load(self._fetch(CS_USERDATA_BASE_URL))
+            return yaml.load(data)
         except:
             return None
 
@@ -204,6 +359,8 @@ def main():
                 'cloudstack_instance_id',
                 'cloudstack_user_data',
             ]),
+            cache_path = dict(default=None),
+            cache_ttl = dict(type='int', default=300),
         ),
         supports_check_mode=False
     )
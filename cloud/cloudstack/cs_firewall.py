@@ -99,11 +99,34 @@ options:
       - Name of the project the firewall rule is related to.
     required: false
     default: null
+  rules:
+    description:
+      - List of rules to manage at once for C(ip_address) or C(network), each a dict of C(protocol), C(cidr),
+        C(start_port), C(end_port), C(icmp_type), C(icmp_code) and C(state). Keys not given fall back to the options
+        of the same name.
+      - The firewall rules are listed once and compared to every rule, and all rules to create or delete are
+        submitted before the async jobs are polled together.
+    required: false
+    default: null
+    version_added: "2.1"
+  purge_rules:
+    description:
+      - Delete the firewall rules of C(ip_address) or C(network) that are not in C(rules).
+      - Only considered if C(rules) is set.
+    required: false
+    default: false
+    version_added: "2.1"
   poll_async:
     description:
       - Poll async jobs until job has finished.
     required: false
     default: true
+  poll_timeout:
+    description:
+      - Seconds to wait for the async jobs of C(rules) to finish, all together.
+    required: false
+    default: 600
+    version_added: "2.1"
 extends_documentation_fragment: cloudstack
 '''
 
@@ -148,6 +171,16 @@ EXAMPLES = '''
     type: egress
     port: 80
     cidr: 10.101.1.20
+
+# Make the firewall rules of 4.3.2.1 exactly these, in one task
+- local_action:
+    module: cs_firewall
+    ip_address: 4.3.2.1
+    purge_rules: yes
+    rules:
+    - { port: 80 }
+    - { port: 443 }
+    - { port: 22, cidr: 10.0.0.0/8 }
 '''
 
 RETURN = '''
@@ -202,8 +235,20 @@ network:
   returned: success
   type: string
   sample: my_network
+rules_added:
+  description: Rules created, if C(rules) is set.
+  returned: success
+  type: list
+  sample: [ { protocol: tcp, cidr: 0.0.0.0/0, start_port: 80, end_port: 80 } ]
+rules_removed:
+  description: Rules deleted, if C(rules) is set.
+  returned: success
+  type: list
+  sample: [ { protocol: tcp, cidr: 0.0.0.0/0, start_port: 8080, end_port: 8080 } ]
 '''
 
+import time
+
 try:
     from cs import CloudStack, CloudStackException, read_config
     has_lib_cs = True
@@ -214,7 +259,109 @@ except ImportError:
 from ansible.module_utils.cloudstack import *
 
 
-class AnsibleCloudStackFirewall(AnsibleCloudStack):
+# Keep AnsibleCloudStackRules identical in cs_firewall and cs_securitygroup_rule.
+class AnsibleCloudStackRules(object):
+    # Reconciles the rules option with the rules in place. The module class
+    # sets RULE_KEYS and implements _rule_source() and _check_rule().
+
+    POLL_INTERVAL_MIN = 1
+    POLL_INTERVAL_MAX = 16
+
+
+    def _rule_key(self, rule):
+        # a hashable form of a rule, comparable between desired and
+        # existing rules
+        key = self._rule_source(rule)
+        key['protocol'] = rule['protocol']
+        if rule['protocol'] in ['tcp', 'udp']:
+            key['start_port'] = int(rule['start_port'])
+            key['end_port'] = int(rule['end_port'])
+        elif rule['protocol'] == 'icmp':
+            key['icmp_type'] = int(rule['icmp_type'])
+            key['icmp_code'] = rule['icmp_code']
+            if key['icmp_code'] is not None:
+                key['icmp_code'] = int(key['icmp_code'])
+        return tuple(sorted(key.items()))
+
+
+    def _rule_result(self, key):
+        return dict(key)
+
+
+    def _desired_rules(self):
+        # the rules option as (key, rule) pairs, options not set per rule
+        # falling back to the module options
+        desired = []
+        for item in self.module.params.get('rules'):
+            if 'port' in item:
+                item = dict(item)
+                item.setdefault('start_port', item.pop('port'))
+            unknown = [ k for k in item if k not in self.RULE_KEYS ]
+            if unknown:
+                self.module.fail_json(msg="unsupported rule keys: %s" % ', '.join(unknown))
+
+            rule = {}
+            for k in self.RULE_KEYS:
+                rule[k] = item.get(k, self.module.params.get(k))
+            if rule['end_port'] is None:
+                rule['end_port'] = rule['start_port']
+            self._check_rule(rule)
+            desired.append((self._rule_key(rule), rule))
+        return desired
+
+
+    def _plan_rules(self, current):
+        # Return the (key, rule) pairs to add and the keys to remove to get
+        # from current, the rules in place by key, to the rules option.
+        wanted = set()
+        unwanted = set()
+        to_add = []
+        to_remove = []
+        for key, rule in self._desired_rules():
+            if rule['state'] == 'absent':
+                if key in current and key not in unwanted:
+                    unwanted.add(key)
+                    to_remove.append(key)
+            elif key not in wanted:
+                wanted.add(key)
+                if key not in current:
+                    to_add.append((key, rule))
+        if self.module.params.get('purge_rules'):
+            to_remove.extend([ key for key in current if key not in wanted and key not in unwanted ])
+
+        self.result['rules_added'] = [ self._rule_result(key) for key, rule in to_add ]
+        self.result['rules_removed'] = [ self._rule_result(key) for key in to_remove ]
+        if to_add or to_remove:
+            self.result['changed'] = True
+        return to_add, to_remove
+
+
+    def _poll_jobs(self, jobs):
+        # Poll several async jobs together until every one has finished and
+        # return their results by job id. The wait between rounds doubles up
+        # to POLL_INTERVAL_MAX and poll_timeout bounds the whole wait.
+        pending = [ job['jobid'] for job in jobs if job and 'jobid' in job ]
+        results = {}
+        deadline = time.time() + self.module.params.get('poll_timeout')
+        interval = self.POLL_INTERVAL_MIN
+        while pending:
+            for jobid in list(pending):
+                res = self.cs.queryAsyncJobResult(jobid=jobid)
+                if res['jobstatus'] != 0 and 'jobresult' in res:
+                    if 'errortext' in res['jobresult']:
+                        self.module.fail_json(msg="Failed: '%s'" % res['jobresult']['errortext'])
+                    results[jobid] = res['jobresult']
+                    pending.remove(jobid)
+            if not pending:
+                break
+            if time.time() + interval > deadline:
+                self.module.fail_json(msg="Timeout waiting for async jobs: %s" % ', '.join(pending))
+            time.sleep(interval)
+            interval = min(interval * 2, self.POLL_INTERVAL_MAX)
+        return results
+
+
+class AnsibleCloudStackFirewall(AnsibleCloudStack, AnsibleCloudStackRules):
 
     def __init__(self, module):
         super(AnsibleCloudStackFirewall, self).__init__(module)
@@ -303,6 +450,89 @@ class AnsibleCloudStackFirewall(AnsibleCloudStack):
         return cidr == rule['cidrlist']
 
 
+    RULE_KEYS = ['protocol', 'cidr', 'start_port', 'end_port', 'icmp_type', 'icmp_code', 'state']
+
+
+    def _rule_source(self, rule):
+        return {'cidr': ','.join(sorted(c.strip() for c in str(rule['cidr']).split(',')))}
+
+
+    def _check_rule(self, rule):
+        if rule['protocol'] in ['tcp', 'udp'] and not (rule['start_port'] and rule['end_port']):
+            self.module.fail_json(msg="missing required argument for protocol '%s': start_port or end_port" % rule['protocol'])
+        if rule['protocol'] == 'icmp' and rule['icmp_type'] is None:
+            self.module.fail_json(msg="missing required argument for protocol 'icmp': icmp_type")
+        if rule['protocol'] == 'all' and self.module.params.get('type') != 'egress':
+            self.module.fail_json(msg="protocol 'all' could only be used for type 'egress'" )
+
+
+    def reconcile_firewall_rules(self):
+        fw_type = self.module.params.get('type')
+
+        args                = {}
+        args['account']     = self.get_account('name')
+        args['domainid']    = self.get_domain('id')
+        args['projectid']   = self.get_project('id')
+        if fw_type == 'egress':
+            args['networkid'] = self.get_network(key='id')
+            if not args['networkid']:
+                self.module.fail_json(msg="missing required argument for type egress: network")
+            firewall_rules = self.cs.listEgressFirewallRules(**args)
+        else:
+            args['ipaddressid'] = self.get_ip_address('id')
+            if not args['ipaddressid']:
+                self.module.fail_json(msg="missing required argument for type ingress: ip_address")
+            firewall_rules = self.cs.listFirewallRules(**args)
+
+        current = {}
+        for rule in (firewall_rules or {}).get('firewallrule', []):
+            key = self._rule_key({
+                'protocol':     rule['protocol'],
+                'cidr':         rule['cidrlist'],
+                'start_port':   rule.get('startport'),
+                'end_port':     rule.get('endport'),
+                'icmp_type':    rule.get('icmptype'),
+                'icmp_code':    rule.get('icmpcode'),
+            })
+            current.setdefault(key, rule)
+
+        to_add, to_remove = self._plan_rules(current)
+        if not (to_add or to_remove) or self.module.check_mode:
+            return
+
+        jobs = []
+        for key, rule in to_add:
+            rule_args                = {}
+            rule_args['cidrlist']    = rule['cidr']
+            rule_args['protocol']    = rule['protocol']
+            rule_args['startport']   = rule['start_port']
+            rule_args['endport']     = rule['end_port']
+            rule_args['icmptype']    = rule['icmp_type']
+            rule_args['icmpcode']    = rule['icmp_code']
+            if fw_type == 'egress':
+                rule_args['networkid'] = args['networkid']
+                res = self.cs.createEgressFirewallRule(**rule_args)
+            else:
+                rule_args['ipaddressid'] = args['ipaddressid']
+                res = self.cs.createFirewallRule(**rule_args)
+            if 'errortext' in res:
+                self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+            jobs.append(res)
+
+        for key in to_remove:
+            if fw_type == 'egress':
+                res = self.cs.deleteEgressFirewallRule(id=current[key]['id'])
+            else:
+                res = self.cs.deleteFirewallRule(id=current[key]['id'])
+            if 'errortext' in res:
+                self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+            jobs.append(res)
+
+        poll_async = self.module.params.get('poll_async')
+        if poll_async:
+            self._poll_jobs(jobs)
+
+
     def get_network(self, key=None, network=None):
         if not network:
             network = self.module.params.get('network')
@@ -407,7 +637,10 @@ def main():
             domain = dict(default=None),
             account = dict(default=None),
             project = dict(default=None),
+            rules = dict(type='list', default=None),
+            purge_rules = dict(type='bool', default=False),
             poll_async = dict(choices=BOOLEANS, default=True),
+            poll_timeout = dict(type='int', default=600),
             api_key = dict(default=None),
             api_secret = dict(default=None, no_log=True),
             api_url = dict(default=None),
@@ -437,7 +670,9 @@ def main():
         acs_fw = AnsibleCloudStackFirewall(module)
 
         state = module.params.get('state')
-        if state in ['absent']:
+        if module.params.get('rules') is not None:
+            fw_rule = acs_fw.reconcile_firewall_rules()
+        elif state in ['absent']:
             fw_rule = acs_fw.remove_firewall_rule()
         else:
             fw_rule = acs_fw.create_firewall_rule()
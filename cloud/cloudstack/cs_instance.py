@@ -195,6 +195,27 @@ options:
       - Poll async jobs until job has finished.
     required: false
     default: true
+  api_cache_path:
+    description:
+      - Directory in which the responses of the zone, domain, account, project, offering, template, ISO and network
+        listings are cached between tasks, per API endpoint and API key.
+      - Within a single run these listings are always issued only once.
+    required: false
+    default: null
+    version_added: "2.1"
+  api_cache_ttl:
+    description:
+      - Seconds a response cached in C(api_cache_path) is used for.
+    required: false
+    default: 300
+    version_added: "2.1"
+  api_page_size:
+    description:
+      - Number of resources fetched per API call when looking up instances, templates, ISOs, offerings and networks.
+      - Lookups are filtered on the server and stop at the first page holding a match.
+    required: false
+    default: 500
+    version_added: "2.1"
 extends_documentation_fragment: cloudstack
 '''
 
@@ -376,6 +397,12 @@ instance_name:
 '''
 
 import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
 
 try:
     from cs import CloudStack, CloudStackException, read_config
@@ -386,11 +413,90 @@ except ImportError:
 # import cloudstack common
 from ansible.module_utils.cloudstack import *
 
+UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+
+class AnsibleCloudStackCache(object):
+    """
+    Wraps the CloudStack API client and answers repeated listings of
+    reference data (zones, domains, offerings, templates, ...) from
+    memory. With a cache_path, responses are also kept on disk for
+    cache_ttl seconds, in one file per API endpoint and API key.
+    """
+
+    CACHED_CALLS = [
+        'listZones',
+        'listDomains',
+        'listAccounts',
+        'listProjects',
+        'listServiceOfferings',
+        'listDiskOfferings',
+        'listTemplates',
+        'listIsos',
+        'listNetworks',
+    ]
+
+    def __init__(self, cs, cache_path=None, cache_ttl=300):
+        self._cs = cs
+        self._memo = {}
+        self._ttl = cache_ttl
+        self._file = None
+        self._disk = {}
+        if cache_path:
+            scope = '%s|%s' % (getattr(cs, 'endpoint', ''), getattr(cs, 'key', ''))
+            self._file = os.path.join(os.path.expanduser(cache_path), 'cs-%s.json' % hashlib.sha1(scope).hexdigest())
+            try:
+                self._disk = json.load(open(self._file))
+            except (IOError, ValueError):
+                self._disk = {}
+
+    def __getattr__(self, name):
+        call = getattr(self._cs, name)
+        if name not in self.CACHED_CALLS:
+            return call
+
+        def cached_call(**kwargs):
+            key = json.dumps([name, kwargs], sort_keys=True)
+            if key not in self._memo:
+                self._memo[key] = self._lookup(key, call, kwargs)
+            return self._memo[key]
+        return cached_call
+
+    def _lookup(self, key, call, kwargs):
+        entry = self._disk.get(key)
+        if entry and time.time() - entry['time'] < self._ttl:
+            return entry['response']
+
+        res = call(**kwargs)
+        if self._file and 'errortext' not in res:
+            self._disk[key] = {'time': time.time(), 'response': res}
+            self._save()
+        return res
+
+    def _save(self):
+        try:
+            dirname = os.path.dirname(self._file)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self._disk, f)
+            finally:
+                f.close()
+            os.rename(tmp, self._file)
+        except (IOError, OSError):
+            # a cache we can't write is no reason to fail the task
+            pass
+
 
 class AnsibleCloudStackInstance(AnsibleCloudStack):
 
     def __init__(self, module):
         super(AnsibleCloudStackInstance, self).__init__(module)
+        self.cs = AnsibleCloudStackCache(self.cs,
+                                         cache_path=module.params.get('api_cache_path'),
+                                         cache_ttl=module.params.get('api_cache_ttl'))
         self.returns = {
             'group':                'group',
             'hypervisor':           'hypervisor',
@@ -407,19 +513,79 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         self.instance = None
         self.template = None
         self.iso = None
+        self.page_size = module.params.get('api_page_size')
+
+
+    def _iter_paged(self, call, result_key, **args):
+        """
+        Yield the resources of a list call, fetching them a page at a time
+        so that a caller that stops early doesn't fetch the rest.
+        """
+        args['pagesize'] = self.page_size
+        page = 1
+        while True:
+            args['page'] = page
+            res = call(**args)
+            if res and 'errortext' in res:
+                self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+            items = (res or {}).get(result_key, [])
+            for item in items:
+                yield item
+            if len(items) < self.page_size:
+                return
+            page += 1
+
+
+    def _resolve(self, call, result_key, names, fields, args, filter_key=None, fallback=True):
+        """
+        Resolve names, display texts or ids to resources, returned as a dict.
+
+        A single name is looked up with a server side filter: by id if it
+        looks like an uuid, else by filter_key. Several names, and names the
+        filter didn't find if fallback is set, are resolved from an index
+        built while walking the unfiltered listing, which stops once every
+        name is found.
+        """
+        found = {}
+        if len(names) == 1:
+            name = names[0]
+            filtered = dict(args)
+            if UUID_RE.match(name):
+                filtered['id'] = name
+            elif filter_key:
+                filtered[filter_key] = name
+            for item in self._iter_paged(call, result_key, **filtered):
+                if name in [ item.get(f) for f in fields ]:
+                    found[name] = item
+                    break
+            if not fallback:
+                return found
+
+        missing = [ n for n in names if n not in found ]
+        if missing:
+            index = {}
+            for item in self._iter_paged(call, result_key, **args):
+                for f in fields:
+                    index.setdefault(item.get(f), item)
+                if not [ n for n in missing if n not in index ]:
+                    break
+            for name in missing:
+                if name in index:
+                    found[name] = index[name]
+        return found
 
 
     def get_service_offering_id(self):
         service_offering = self.module.params.get('service_offering')
 
-        service_offerings = self.cs.listServiceOfferings()
-        if service_offerings:
-            if not service_offering:
-                return service_offerings['serviceoffering'][0]['id']
-
-            for s in service_offerings['serviceoffering']:
-                if service_offering in [ s['name'], s['id'] ]:
-                    return s['id']
+        if not service_offering:
+            for s in self._iter_paged(self.cs.listServiceOfferings, 'serviceoffering'):
+                return s['id']
+        else:
+            found = self._resolve(self.cs.listServiceOfferings, 'serviceoffering', [ service_offering ],
+                                  ['name', 'id'], {}, filter_key='name')
+            if service_offering in found:
+                return found[service_offering]['id']
         self.module.fail_json(msg="Service offering '%s' not found" % service_offering)
 
 
@@ -442,24 +608,22 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 return self._get_by_key(key, self.template)
 
             args['templatefilter'] = 'executable'
-            templates = self.cs.listTemplates(**args)
-            if templates:
-                for t in templates['template']:
-                    if template in [ t['displaytext'], t['name'], t['id'] ]:
-                        self.template = t
-                        return self._get_by_key(key, self.template)
+            found = self._resolve(self.cs.listTemplates, 'template', [ template ],
+                                  ['displaytext', 'name', 'id'], args, filter_key='name')
+            if template in found:
+                self.template = found[template]
+                return self._get_by_key(key, self.template)
             self.module.fail_json(msg="Template '%s' not found" % template)
 
         elif iso:
             if self.iso:
                 return self._get_by_key(key, self.iso)
             args['isofilter'] = 'executable'
-            isos = self.cs.listIsos(**args)
-            if isos:
-                for i in isos['iso']:
-                    if iso in [ i['displaytext'], i['name'], i['id'] ]:
-                        self.iso = i
-                        return self._get_by_key(key, self.iso)
+            found = self._resolve(self.cs.listIsos, 'iso', [ iso ],
+                                  ['displaytext', 'name', 'id'], args, filter_key='name')
+            if iso in found:
+                self.iso = found[iso]
+                return self._get_by_key(key, self.iso)
             self.module.fail_json(msg="ISO '%s' not found" % iso)
 
 
@@ -469,11 +633,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not disk_offering:
             return None
 
-        disk_offerings = self.cs.listDiskOfferings()
-        if disk_offerings:
-            for d in disk_offerings['diskoffering']:
-                if disk_offering in [ d['displaytext'], d['name'], d['id'] ]:
-                    return d['id']
+        found = self._resolve(self.cs.listDiskOfferings, 'diskoffering', [ disk_offering ],
+                              ['displaytext', 'name', 'id'], {}, filter_key='name')
+        if disk_offering in found:
+            return found[disk_offering]['id']
         self.module.fail_json(msg="Disk offering '%s' not found" % disk_offering)
 
 
@@ -487,12 +650,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             args['domainid']    = self.get_domain(key='id')
             args['projectid']   = self.get_project(key='id')
             # Do not pass zoneid, as the instance name must be unique across zones.
-            instances = self.cs.listVirtualMachines(**args)
-            if instances:
-                for v in instances['virtualmachine']:
-                    if instance_name in [ v['name'], v['displayname'], v['id'] ]:
-                        self.instance = v
-                        break
+            # The keyword filter matches both name and display name.
+            found = self._resolve(self.cs.listVirtualMachines, 'virtualmachine', [ instance_name ],
+                                  ['name', 'displayname', 'id'], args, filter_key='keyword', fallback=False)
+            self.instance = found.get(instance_name)
         return self.instance
 
     def get_iptonetwork_mappings(self):
@@ -523,18 +684,14 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         args['projectid']   = self.get_project(key='id')
         args['zoneid']      = self.get_zone(key='id')
 
-        networks = self.cs.listNetworks(**args)
-        if not networks:
-            self.module.fail_json(msg="No networks available")
-
+        found = self._resolve(self.cs.listNetworks, 'network', network_names,
+                              ['displaytext', 'name', 'id'], args, filter_key='keyword')
         network_ids = []
         network_displaytexts = []
         for network_name in network_names:
-            for n in networks['network']:
-                if network_name in [ n['displaytext'], n['name'], n['id'] ]:
-                    network_ids.append(n['id'])
-                    network_displaytexts.append(n['name'])
-                    break
+            if network_name in found:
+                network_ids.append(found[network_name]['id'])
+                network_displaytexts.append(found[network_name]['name'])
 
         if len(network_ids) != len(network_names):
             self.module.fail_json(msg="Could not find all networks, networks list found: %s" % network_displaytexts)
@@ -857,6 +1014,9 @@ def main():
             api_http_method = dict(choices=['get', 'post'], default='get'),
             api_timeout = dict(type='int', default=10),
             api_region = dict(default='cloudstack'),
+            api_cache_path = dict(default=None),
+            api_cache_ttl = dict(type='int', default=300),
+            api_page_size = dict(type='int', default=500),
         ),
         mutually_exclusive = (
             ['template', 'iso'],
@@ -85,11 +85,34 @@ options:
       - Name of the project the security group to be created in.
     required: false
     default: null
+  rules:
+    description:
+      - List of rules to manage at once, each a dict of C(type), C(protocol), C(cidr), C(user_security_group),
+        C(start_port), C(end_port), C(icmp_type), C(icmp_code) and C(state). Keys not given fall back to the options of
+        the same name.
+      - The security group is fetched once and compared to every rule, and all rules to add or remove are submitted
+        before the async jobs are polled together.
+    required: false
+    default: null
+    version_added: "2.1"
+  purge_rules:
+    description:
+      - Remove the rules of the security group that are not in C(rules).
+      - Only considered if C(rules) is set.
+    required: false
+    default: false
+    version_added: "2.1"
   poll_async:
     description:
       - Poll async jobs until job has finished.
     required: false
     default: true
+  poll_timeout:
+    description:
+      - Seconds to wait for the async jobs of C(rules) to finish, all together.
+    required: false
+    default: 600
+    version_added: "2.1"
 extends_documentation_fragment: cloudstack
 '''
 
@@ -135,6 +158,18 @@ EXAMPLES = '''
     security_group: default
     port: 80
     user_security_group: web
+
+# Make the rules of security group 'web' exactly these, in one task
+- local_action:
+    module: cs_securitygroup_rule
+    security_group: web
+    purge_rules: yes
+    rules:
+    - { port: 80 }
+    - { port: 443 }
+    - { port: 22, cidr: 10.0.0.0/8 }
+    - { protocol: icmp, icmp_type: -1, icmp_code: -1 }
+    - { type: egress, protocol: tcp, start_port: 1, end_port: 65535 }
 '''
 
 RETURN = '''
@@ -179,8 +214,20 @@ end_port:
   returned: success
   type: int
   sample: 80
+rules_added:
+  description: Rules added to the security group, if C(rules) is set.
+  returned: success
+  type: list
+  sample: [ { type: ingress, protocol: tcp, cidr: 0.0.0.0/0, start_port: 80, end_port: 80 } ]
+rules_removed:
+  description: Rules removed from the security group, if C(rules) is set.
+  returned: success
+  type: list
+  sample: [ { type: ingress, protocol: tcp, cidr: 0.0.0.0/0, start_port: 8080, end_port: 8080 } ]
 '''
 
+import time
+
 try:
     from cs import CloudStack, CloudStackException, read_config
     has_lib_cs = True
@@ -191,7 +238,109 @@ except ImportError:
 from ansible.module_utils.cloudstack import *
 
 
-class AnsibleCloudStackSecurityGroupRule(AnsibleCloudStack):
+# Keep AnsibleCloudStackRules identical in cs_firewall and cs_securitygroup_rule.
+class AnsibleCloudStackRules(object):
+    # Reconciles the rules option with the rules in place. The module class
+    # sets RULE_KEYS and implements _rule_source() and _check_rule().
+
+    POLL_INTERVAL_MIN = 1
+    POLL_INTERVAL_MAX = 16
+
+
+    def _rule_key(self, rule):
+        # a hashable form of a rule, comparable between desired and
+        # existing rules
+        key = self._rule_source(rule)
+        key['protocol'] = rule['protocol']
+        if rule['protocol'] in ['tcp', 'udp']:
+            key['start_port'] = int(rule['start_port'])
+            key['end_port'] = int(rule['end_port'])
+        elif rule['protocol'] == 'icmp':
+            key['icmp_type'] = int(rule['icmp_type'])
+            key['icmp_code'] = rule['icmp_code']
+            if key['icmp_code'] is not None:
+                key['icmp_code'] = int(key['icmp_code'])
+        return tuple(sorted(key.items()))
+
+
+    def _rule_result(self, key):
+        return dict(key)
+
+
+    def _desired_rules(self):
+        # the rules option as (key, rule) pairs, options not set per rule
+        # falling back to the module options
+        desired = []
+        for item in self.module.params.get('rules'):
+            if 'port' in item:
+                item = dict(item)
+                item.setdefault('start_port', item.pop('port'))
+            unknown = [ k for k in item if k not in self.RULE_KEYS ]
+            if unknown:
+                self.module.fail_json(msg="unsupported rule keys: %s" % ', '.join(unknown))
+
+            rule = {}
+            for k in self.RULE_KEYS:
+                rule[k] = item.get(k, self.module.params.get(k))
+            if rule['end_port'] is None:
+                rule['end_port'] = rule['start_port']
+            self._check_rule(rule)
+            desired.append((self._rule_key(rule), rule))
+        return desired
+
+
+    def _plan_rules(self, current):
+        # Return the (key, rule) pairs to add and the keys to remove to get
+        # from current, the rules in place by key, to the rules option.
+        wanted = set()
+        unwanted = set()
+        to_add = []
+        to_remove = []
+        for key, rule in self._desired_rules():
+            if rule['state'] == 'absent':
+                if key in current and key not in unwanted:
+                    unwanted.add(key)
+                    to_remove.append(key)
+            elif key not in wanted:
+                wanted.add(key)
+                if key not in current:
+                    to_add.append((key, rule))
+        if self.module.params.get('purge_rules'):
+            to_remove.extend([ key for key in current if key not in wanted and key not in unwanted ])
+
+        self.result['rules_added'] = [ self._rule_result(key) for key, rule in to_add ]
+        self.result['rules_removed'] = [ self._rule_result(key) for key in to_remove ]
+        if to_add or to_remove:
+            self.result['changed'] = True
+        return to_add, to_remove
+
+
+    def _poll_jobs(self, jobs):
+        # Poll several async jobs together until every one has finished and
+        # return their results by job id. The wait between rounds doubles up
+        # to POLL_INTERVAL_MAX and poll_timeout bounds the whole wait.
+        pending = [ job['jobid'] for job in jobs if job and 'jobid' in job ]
+        results = {}
+        deadline = time.time() + self.module.params.get('poll_timeout')
+        interval = self.POLL_INTERVAL_MIN
+        while pending:
+            for jobid in list(pending):
+                res = self.cs.queryAsyncJobResult(jobid=jobid)
+                if res['jobstatus'] != 0 and 'jobresult' in res:
+                    if 'errortext' in res['jobresult']:
+                        self.module.fail_json(msg="Failed: '%s'" % res['jobresult']['errortext'])
+                    results[jobid] = res['jobresult']
+                    pending.remove(jobid)
+            if not pending:
+                break
+            if time.time() + interval > deadline:
+                self.module.fail_json(msg="Timeout waiting for async jobs: %s" % ', '.join(pending))
+            time.sleep(interval)
+            interval = min(interval * 2, self.POLL_INTERVAL_MAX)
+        return results
+
+
+class AnsibleCloudStackSecurityGroupRule(AnsibleCloudStack, AnsibleCloudStackRules):
 
     def __init__(self, module):
         super(AnsibleCloudStackSecurityGroupRule, self).__init__(module)
@@ -362,6 +511,88 @@ class AnsibleCloudStackSecurityGroupRule(AnsibleCloudStack):
         return rule
 
 
+    RULE_KEYS = ['type', 'protocol', 'cidr', 'user_security_group', 'start_port', 'end_port', 'icmp_type', 'icmp_code', 'state']
+
+
+    def _rule_source(self, rule):
+        if rule['user_security_group']:
+            return {'type': rule['type'], 'user_security_group': rule['user_security_group']}
+        return {'type': rule['type'], 'cidr': rule['cidr']}
+
+
+    def _check_rule(self, rule):
+        if rule['protocol'] in ['tcp', 'udp'] and not (rule['start_port'] and rule['end_port']):
+            self.module.fail_json(msg="no start_port or end_port set for protocol '%s'" % rule['protocol'])
+        if rule['protocol'] == 'icmp' and (rule['icmp_type'] is None or rule['icmp_code'] is None):
+            self.module.fail_json(msg="no icmp_type or icmp_code set for protocol '%s'" % rule['protocol'])
+
+
+    def reconcile_rules(self):
+        security_group = self.get_security_group()
+
+        current = {}
+        for sg_type in ['ingress', 'egress']:
+            for rule in security_group.get(sg_type + 'rule', []):
+                key = self._rule_key({
+                    'type':                 sg_type,
+                    'protocol':             rule['protocol'],
+                    'cidr':                 rule.get('cidr'),
+                    'user_security_group':  rule.get('securitygroupname'),
+                    'start_port':           rule.get('startport'),
+                    'end_port':             rule.get('endport'),
+                    'icmp_type':            rule.get('icmptype'),
+                    'icmp_code':            rule.get('icmpcode'),
+                })
+                current.setdefault(key, (sg_type, rule))
+
+        to_add, to_remove = self._plan_rules(current)
+        if not (to_add or to_remove) or self.module.check_mode:
+            return
+
+        jobs = []
+        user_security_groups = {}
+        for key, rule in to_add:
+            args = {}
+            if rule['user_security_group']:
+                name = rule['user_security_group']
+                if name not in user_security_groups:
+                    user_security_groups[name] = self.get_security_group(name)
+                args['usersecuritygrouplist'] = [{
+                    'group': user_security_groups[name]['name'],
+                    'account': user_security_groups[name]['account'],
+                }]
+            else:
+                args['cidrlist'] = rule['cidr']
+            args['protocol']        = rule['protocol']
+            args['startport']       = rule['start_port']
+            args['endport']         = rule['end_port']
+            args['icmptype']        = rule['icmp_type']
+            args['icmpcode']        = rule['icmp_code']
+            args['projectid']       = self.get_project('id')
+            args['securitygroupid'] = security_group['id']
+            if rule['type'] == 'egress':
+                res = self.cs.authorizeSecurityGroupEgress(**args)
+            else:
+                res = self.cs.authorizeSecurityGroupIngress(**args)
+            if res and 'errortext' in res:
+                self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+            jobs.append(res)
+
+        for key in to_remove:
+            sg_type, rule = current[key]
+            if sg_type == 'egress':
+                res = self.cs.revokeSecurityGroupEgress(id=rule['ruleid'])
+            else:
+                res = self.cs.revokeSecurityGroupIngress(id=rule['ruleid'])
+            if res and 'errortext' in res:
+                self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+            jobs.append(res)
+
+        poll_async = self.module.params.get('poll_async')
+        if poll_async:
+            self._poll_jobs(jobs)
+
+
     def get_result(self, security_group_rule):
         super(AnsibleCloudStackSecurityGroupRule, self).get_result(security_group_rule)
         self.result['type'] = self.module.params.get('type')
@@ -384,7 +615,10 @@ def main():
             end_port = dict(type='int', default=None),
             state = dict(choices=['present', 'absent'], default='present'),
             project = dict(default=None),
+            rules = dict(type='list', default=None),
+            purge_rules = dict(type='bool', default=False),
             poll_async = dict(choices=BOOLEANS, default=True),
+            poll_timeout = dict(type='int', default=600),
             api_key = dict(default=None),
             api_secret = dict(default=None, no_log=True),
             api_url = dict(default=None),
@@ -412,7 +646,9 @@ def main():
         acs_sg_rule = AnsibleCloudStackSecurityGroupRule(module)
 
         state = module.params.get('state')
-        if state in ['absent']:
+        if module.params.get('rules') is not None:
+            sg_rule = acs_sg_rule.reconcile_rules()
+        elif state in ['absent']:
             sg_rule = acs_sg_rule.remove_rule()
         else:
             sg_rule = acs_sg_rule.add_rule()
@@ -149,11 +149,45 @@ options:
         choices:
           - gzip
           - bzip2
+          - xz
+          - zstd
           - none
         description:
           - Type of compression to use when creating an archive of a running
             container.
         default: gzip
+    archive_method:
+        choices:
+          - copy
+          - stream
+        description:
+          - How the archive is built. `copy` stages the container in a
+            temporary directory with rsync and then runs tar over it. `stream`
+            reads the frozen container, LVM snapshot or overlayfs mount
+            directly into a tar stream piped through a multi-threaded
+            compressor when one is installed (pigz, pbzip2, xz -T0,
+            zstd -T0), without the staging copy.
+        default: copy
+        version_added: "2.1"
+    archive_checksum:
+        choices:
+          - true
+          - false
+        description:
+          - Only with `archive_method` stream. Compute the sha256 of the
+            archive while it is written and store it next to the archive as
+            "<archive>.sha256".
+        default: false
+        version_added: "2.1"
+    archive_manifest:
+        choices:
+          - true
+          - false
+        description:
+          - Only with `archive_method` stream. Write the list of archived
+            members next to the archive as "<archive>.manifest".
+        default: false
+        version_added: "2.1"
     state:
         choices:
           - started
@@ -319,6 +353,15 @@ EXAMPLES = """
 # Create a container using overlayfs, create an archive of it, create a
 # snapshot clone of the container and and finally leave the container
 # in a frozen state. The container archive will be compressed using gzip.
+- name: Stream an archive of a container with parallel compression
+  lxc_container:
+    name: test-container-lvm
+    archive: true
+    archive_method: stream
+    archive_compression: zstd
+    archive_checksum: true
+    archive_manifest: true
+
 - name: Create an overlayfs container archive and clone it
   lxc_container:
     name: test-container-overlayfs
@@ -382,6 +425,9 @@ EXAMPLES = """
 """
 
 
+import hashlib
+import subprocess
+
 try:
     import lxc
 except ImportError:
@@ -401,6 +447,14 @@ LXC_COMPRESSION_MAP = {
         'extension': 'tar.bz2',
         'argument': '-cjf'
     },
+    'xz': {
+        'extension': 'tar.xz',
+        'argument': '-cJf'
+    },
+    'zstd': {
+        'extension': 'tar.zst',
+        'argument': '-I zstd -cf'
+    },
     'none': {
         'extension': 'tar',
         'argument': '-cf'
@@ -408,6 +462,18 @@ LXC_COMPRESSION_MAP = {
 }
 
 
+# LXC_STREAM_COMPRESSORS is a map of compression types to the compressor
+# commands, in order of preference, used when streaming an archive. The first
+# command found on the host is used; none is used for uncompressed archives.
+LXC_STREAM_COMPRESSORS = {
+    'gzip': [['pigz', '-c'], ['gzip', '-c']],
+    'bzip2': [['pbzip2', '-c'], ['bzip2', '-c']],
+    'xz': [['xz', '-T0', '-c']],
+    'zstd': [['zstd', '-T0', '-q', '-c']],
+    'none': []
+}
+
+
 # LXC_COMMAND_MAP is a map of variables that are available to a method based
 # on the state the container is in.
 LXC_COMMAND_MAP = {
@@ -930,15 +996,14 @@ class LxcContainerManagement(object):
         """
 
         self.container = self.get_container_bind()
-        for _ in xrange(timeout):
-            if self._get_state() != 'running':
+        deadline = time.time() + timeout
+        while self._get_state() != 'running':
+            if time.time() < deadline:
                 self.container.start()
                 self.state_change = True
-                # post startup sleep for 1 second.
-                time.sleep(1)
-            else:
-                return True
-        else:
+                self._wait_for_state('running', deadline - time.time())
+                continue
+
             self.failure(
                 lxc_container=self._container_data(),
                 error='Failed to start container'
@@ -948,6 +1013,23 @@ class LxcContainerManagement(object):
                     ' available and that the container is in a functional'
                     ' state.' % self.container_name
             )
+        return True
+
+    def _wait_for_state(self, state, timeout):
+        """Block until the container reaches a given state.
+
+        This uses the lxc monitor through ``Container.wait`` and returns as
+        soon as the container gets to ``state`` instead of polling it.
+
+        :param state: State to wait for, as returned by ``_get_state``.
+        :type state: ``str``
+        :param timeout: Seconds to wait before giving up.
+        :type timeout: ``int``
+        :returns: True or False based on if the state was reached.
+        :rtype: ``bol``
+        """
+
+        return self.container.wait(state.upper(), max(int(timeout), 1))
 
     def _check_archive(self):
         """Create a compressed archive of a container.
@@ -956,9 +1038,12 @@ class LxcContainerManagement(object):
         """
 
         if self.module.params.get('archive') in BOOLEANS_TRUE:
-            self.archive_info = {
-                'archive': self._container_create_tar()
-            }
+            if self.module.params.get('archive_method') == 'stream':
+                self.archive_info = self._container_stream_tar()
+            else:
+                self.archive_info = {
+                    'archive': self._container_create_tar()
+                }
 
     def _check_clone(self):
         """Create a compressed archive of a container.
@@ -984,26 +1069,27 @@ class LxcContainerManagement(object):
         :type timeout: ``int``
         """
 
-        for _ in xrange(timeout):
-            if not self._container_exists(container_name=self.container_name):
-                break
+        deadline = time.time() + timeout
+        while self._container_exists(container_name=self.container_name):
+            if time.time() < deadline:
+                # Check if the container needs to have an archive created.
+                self._check_archive()
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
-
-            # Check if the container is to be cloned
-            self._check_clone()
+                # Check if the container is to be cloned
+                self._check_clone()
 
-            if self._get_state() != 'stopped':
-                self.state_change = True
-                self.container.stop()
+                if self._get_state() != 'stopped':
+                    self.state_change = True
+                    self.container.stop()
+                    self._wait_for_state('stopped', deadline - time.time())
 
-            if self.container.destroy():
-                self.state_change = True
+                if self.container.destroy():
+                    self.state_change = True
+                else:
+                    # back off before retrying a failed destroy.
+                    time.sleep(1)
+                continue
 
-            # post destroy attempt sleep for 1 second.
-            time.sleep(1)
-        else:
             self.failure(
                 lxc_container=self._container_data(),
                 error='Failed to destroy container'
@@ -1330,21 +1416,9 @@ class LxcContainerManagement(object):
         :type source_dir: ``str``
         """
 
-        archive_path = self.module.params.get('archive_path')
-        if not os.path.isdir(archive_path):
-            os.makedirs(archive_path)
-
         archive_compression = self.module.params.get('archive_compression')
         compression_type = LXC_COMPRESSION_MAP[archive_compression]
-
-        # remove trailing / if present.
-        archive_name = '%s.%s' % (
-            os.path.join(
-                archive_path,
-                self.container_name
-            ),
-            compression_type['extension']
-        )
+        archive_name = self._archive_name(archive_compression)
 
         build_command = [
             self.module.get_bin_path('tar', True),
@@ -1581,6 +1655,254 @@ class LxcContainerManagement(object):
             # Remove tmpdir
             shutil.rmtree(temp_dir)
 
+    def _archive_name(self, archive_compression):
+        """Return the archive file name, creating ``archive_path`` if needed.
+
+        :param archive_compression: Type of compression used.
+        :type archive_compression: ``str``
+        """
+
+        archive_path = self.module.params.get('archive_path')
+        if not os.path.isdir(archive_path):
+            os.makedirs(archive_path)
+
+        return '%s.%s' % (
+            os.path.join(archive_path, self.container_name),
+            LXC_COMPRESSION_MAP[archive_compression]['extension']
+        )
+
+    def _stream_compressor(self, archive_compression):
+        """Return the compressor command used when streaming an archive.
+
+        :param archive_compression: Type of compression to use.
+        :type archive_compression: ``str``
+        :returns: Command list or None for uncompressed archives.
+        :rtype: ``list``
+        """
+
+        commands = LXC_STREAM_COMPRESSORS[archive_compression]
+        for command in commands:
+            bin_path = self.module.get_bin_path(command[0])
+            if bin_path:
+                return [bin_path] + command[1:]
+        if commands:
+            self.failure(
+                err='no %s compressor found' % archive_compression,
+                rc=1,
+                msg='None of [ %s ] is installed on the host.'
+                    % ', '.join([i[0] for i in commands])
+            )
+        return None
+
+    def _stream_tar(self, tar_command, archive_name, checksum=False):
+        """Pipe ``tar_command`` through the compressor into ``archive_name``.
+
+        :param tar_command: tar command writing the archive to stdout.
+        :type tar_command: ``list``
+        :param archive_name: Path of the archive to write.
+        :type archive_name: ``str``
+        :param checksum: Compute the sha256 of the archive while writing it.
+        :type checksum: ``bol``
+        :returns: sha256 hex digest of the archive or None.
+        :rtype: ``str``
+        """
+
+        compressor = self._stream_compressor(
+            self.module.params.get('archive_compression')
+        )
+        digest = hashlib.sha256()
+        errors = tempfile.TemporaryFile()
+        try:
+            tar = subprocess.Popen(
+                tar_command,
+                stdout=subprocess.PIPE,
+                stderr=errors
+            )
+            stream = tar.stdout
+            if compressor:
+                compress = subprocess.Popen(
+                    compressor,
+                    stdin=tar.stdout,
+                    stdout=subprocess.PIPE,
+                    stderr=errors
+                )
+                # only the compressor may hold the tar pipe open now.
+                tar.stdout.close()
+                stream = compress.stdout
+
+            archive = open(archive_name, 'wb')
+            try:
+                while True:
+                    chunk = stream.read(1048576)
+                    if not chunk:
+                        break
+                    archive.write(chunk)
+                    if checksum:
+                        digest.update(chunk)
+            finally:
+                archive.close()
+
+            tar_rc = tar.wait()
+            compress_rc = 0
+            if compressor:
+                compress_rc = compress.wait()
+
+            # tar returns 1 when files changed while being read.
+            if tar_rc > 1 or compress_rc != 0:
+                errors.seek(0)
+                self.failure(
+                    err=errors.read(),
+                    rc=tar_rc or compress_rc,
+                    msg='failed to stream tar archive',
+                    command=' '.join(tar_command + ['|'] + (compressor or []))
+                )
+        finally:
+            errors.close()
+
+        if checksum:
+            return digest.hexdigest()
+
+    def _container_stream_tar(self):
+        """Create a tar archive from an LXC container without a staging copy.
+
+        The process is as follows:
+            * Stop or Freeze the container
+            * If LVM backed:
+                * Create LVM snapshot of LV backing the container
+                * Mount the snapshot to tmpdir/rootfs
+            * If overlayfs backed:
+                * Mount the lower and upper dirs to tmpdir/rootfs
+            * Stream the container config dir and rootfs through tar and the
+              compressor into the archive, hashing it on the way if asked
+            * Restore the state of the container
+            * Clean up
+        """
+
+        archive_name = self._archive_name(
+            self.module.params.get('archive_compression')
+        )
+        archive_info = {'archive': archive_name}
+
+        temp_dir = tempfile.mkdtemp()
+        mount_point = os.path.join(temp_dir, 'rootfs')
+
+        # Container config directory and rootfs.
+        container_dir = os.path.dirname(self.container.config_file_name)
+        lxc_rootfs = self.container.get_config_item('lxc.rootfs')
+        block_backed = lxc_rootfs.startswith(os.path.join(os.sep, 'dev'))
+        overlayfs_backed = lxc_rootfs.startswith('overlayfs')
+        rootfs_path = lxc_rootfs.split(':')[-1]
+
+        snapshot_name = '%s_lxc_snapshot' % self.container_name
+
+        tar_command = [
+            self.module.get_bin_path('tar', True),
+            '-cf',
+            '-'
+        ]
+        if self.module.params.get('archive_manifest') in BOOLEANS_TRUE:
+            archive_info['archive_manifest'] = '%s.manifest' % archive_name
+            tar_command.extend(
+                ['-v', '--index-file=%s' % archive_info['archive_manifest']]
+            )
+
+        members = [
+            './%s' % i for i in sorted(os.listdir(container_dir))
+            if not ((block_backed or overlayfs_backed) and i == 'rootfs')
+        ]
+        tar_command.extend(['-C', container_dir] + members)
+
+        container_state = self._get_state()
+        mounted = False
+        snapshot = False
+        try:
+            # Ensure the original container is stopped or frozen
+            if container_state not in ['stopped', 'frozen']:
+                if container_state == 'running':
+                    self.container.freeze()
+                else:
+                    self.container.stop()
+
+            if block_backed:
+                if snapshot_name in self._lvm_lv_list():
+                    self.failure(
+                        err='snapshot [ %s ] already exists' % snapshot_name,
+                        rc=1,
+                        msg='The snapshot [ %s ] already exists. Please clean'
+                            ' up old snapshot of containers before continuing.'
+                            % snapshot_name
+                    )
+                os.makedirs(mount_point)
+                size, measurement = self._get_lv_size(
+                    lv_name=self.container_name
+                )
+                self._lvm_snapshot_create(
+                    source_lv=self.container_name,
+                    snapshot_name=snapshot_name,
+                    snapshot_size_gb=size
+                )
+                snapshot = True
+                self._lvm_lv_mount(
+                    lv_name=snapshot_name,
+                    mount_point=mount_point
+                )
+                mounted = True
+                tar_command.extend(['-C', temp_dir, './rootfs'])
+            elif overlayfs_backed:
+                os.makedirs(mount_point)
+                lowerdir, upperdir = lxc_rootfs.split(':')[1:]
+                self._overlayfs_mount(
+                    lowerdir=lowerdir,
+                    upperdir=upperdir,
+                    mount_point=mount_point
+                )
+                mounted = True
+                tar_command.extend(['-C', temp_dir, './rootfs'])
+            elif (os.path.isdir(rootfs_path)
+                  and os.path.dirname(rootfs_path) != container_dir):
+                # rootfs kept outside of the container dir, archive it under
+                # the same name it has when it is inside.
+                tar_command.extend([
+                    '-C', os.path.dirname(rootfs_path),
+                    '--transform',
+                    's,^\\./%s,./rootfs,' % os.path.basename(rootfs_path),
+                    './%s' % os.path.basename(rootfs_path)
+                ])
+
+            checksum = self._stream_tar(
+                tar_command=tar_command,
+                archive_name=archive_name,
+                checksum=self.module.params.get(
+                    'archive_checksum'
+                ) in BOOLEANS_TRUE
+            )
+            if checksum:
+                archive_info['archive_checksum'] = checksum
+                with open('%s.sha256' % archive_name, 'wb') as f:
+                    f.write('%s  %s\n' % (
+                        checksum, os.path.basename(archive_name)
+                    ))
+
+            # Set the state as changed and set a new fact
+            self.state_change = True
+            return archive_info
+        finally:
+            if mounted:
+                self._unmount(mount_point)
+
+            if snapshot:
+                self._lvm_lv_remove(snapshot_name)
+
+            # Restore original state of container
+            if container_state == 'running':
+                if self._get_state() == 'frozen':
+                    self.container.unfreeze()
+                else:
+                    self.container.start()
+
+            # Remove tmpdir
+            shutil.rmtree(temp_dir)
+
     def check_count(self, count, method):
         if count > 1:
             self.failure(
@@ -1709,6 +2031,18 @@ def main():
             archive_compression=dict(
                 choices=LXC_COMPRESSION_MAP.keys(),
                 default='gzip'
+            ),
+            archive_method=dict(
+                choices=['copy', 'stream'],
+                default='copy'
+            ),
+            archive_checksum=dict(
+                choices=BOOLEANS,
+                default='false'
+            ),
+            archive_manifest=dict(
+                choices=BOOLEANS,
+                default='false'
             )
         ),
         supports_check_mode=False,
@@ -46,6 +46,26 @@ options:
             - The password of the vSphere vCenter
         required: True
         aliases: ['pass', 'pwd']
+    name:
+        description:
+            - Only return the virtual machines whose name matches this shell style pattern
+        required: False
+        default: null
+        version_added: 2.1
+    folder:
+        description:
+            - Only return the virtual machines in this folder and its subfolders, given as inventory path
+              e.g. C(DC1/vm/production)
+        required: False
+        default: null
+        version_added: 2.1
+    properties:
+        description:
+            - Additional property paths to return for each virtual machine, e.g. C(config.hardware.numCPU).
+              Each is returned under its path.
+        required: False
+        default: []
+        version_added: 2.1
 '''
 
 EXAMPLES = '''
@@ -55,8 +75,21 @@ EXAMPLES = '''
     hostname: esxi_or_vcenter_ip_or_hostname
     username: username
     password: password
+
+- name: Gather the number of CPUs of the web servers in the production folder
+  local_action:
+    module: vmware_vm_facts
+    hostname: esxi_or_vcenter_ip_or_hostname
+    username: username
+    password: password
+    folder: DC1/vm/production
+    name: "web*"
+    properties:
+      - config.hardware.numCPU
 '''
 
+import fnmatch
+
 try:
     from pyVmomi import vim, vmodl
     HAS_PYVMOMI = True
@@ -64,34 +97,95 @@ except ImportError:
     HAS_PYVMOMI = False
 
 
-# https://github.com/vmware/pyvmomi-community-samples/blob/master/samples/getallvms.py
-def get_all_virtual_machines(content):
-    virtual_machines = get_all_objs(content, [vim.VirtualMachine])
+# The facts returned for every virtual machine and the property paths they come from
+VM_PROPERTIES = {
+    'guest_fullname': 'config.guestFullName',
+    'power_state': 'runtime.powerState',
+    'ip_address': 'guest.ipAddress',
+}
+
+# Number of objects per RetrievePropertiesEx / ContinueRetrievePropertiesEx call
+PAGE_SIZE = 1000
+
+
+def retrieve_properties(content, container, obj_type, paths):
+    """Yield (managed object, {path: value}) for every object of obj_type in container.
+
+    A single property collector query over a container view fetches only
+    the given property paths, a page of objects at a time.
+    """
+    view = content.viewManager.CreateContainerView(container, [obj_type], True)
+    try:
+        traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+            name='traverseView', path='view', skip=False, type=vim.view.ContainerView)
+        object_spec = vmodl.query.PropertyCollector.ObjectSpec(
+            obj=view, skip=True, selectSet=[traversal_spec])
+        property_spec = vmodl.query.PropertyCollector.PropertySpec(
+            type=obj_type, pathSet=paths, all=False)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[object_spec], propSet=[property_spec])
+        options = vmodl.query.PropertyCollector.RetrieveOptions(maxObjects=PAGE_SIZE)
+
+        collector = content.propertyCollector
+        result = collector.RetrievePropertiesEx([filter_spec], options)
+        while result:
+            for obj in result.objects:
+                yield obj.obj, dict((prop.name, prop.val) for prop in obj.propSet)
+            if not result.token:
+                break
+            result = collector.ContinueRetrievePropertiesEx(result.token)
+    finally:
+        view.Destroy()
+
+
+def serialize_property(value):
+    """Turn a property value into something that can be returned as JSON."""
+    if value is None or isinstance(value, (basestring, bool, int, long, float)):
+        return value
+    if isinstance(value, vmodl.ManagedObject):
+        return value._moId
+    if isinstance(value, (list, tuple)):
+        return [serialize_property(v) for v in value]
+    if isinstance(value, vmodl.DynamicData):
+        return dict((prop.name, serialize_property(getattr(value, prop.name)))
+                    for prop in value._GetPropertyList())
+    return str(value)
+
+
+def get_all_virtual_machines(content, name=None, folder=None, properties=None):
+    container = content.rootFolder
+    if folder:
+        container = content.searchIndex.FindByInventoryPath(folder)
+        if container is None:
+            raise Exception("Folder %s not found" % folder)
+
+    properties = properties or []
+    paths = ['name'] + list(set(VM_PROPERTIES.values() + properties))
     _virtual_machines = {}
 
-    for vm in virtual_machines:
-        _ip_address = ""
-        summary = vm.summary
-        if summary.guest is not None:
-            _ip_address = summary.guest.ipAddress
-            if _ip_address is None:
-                _ip_address = ""
-
-        virtual_machine = {
-            summary.config.name: {
-                "guest_fullname": summary.config.guestFullName,
-                "power_state": summary.runtime.powerState,
-                "ip_address": _ip_address
-            }
-        }
-
-        _virtual_machines.update(virtual_machine)
+    for vm, props in retrieve_properties(content, container, vim.VirtualMachine, paths):
+        vm_name = props.get('name')
+        if name and not fnmatch.fnmatch(vm_name, name):
+            continue
+
+        virtual_machine = {}
+        for fact, path in VM_PROPERTIES.items():
+            virtual_machine[fact] = props.get(path)
+        if virtual_machine['ip_address'] is None:
+            virtual_machine['ip_address'] = ""
+        for path in properties:
+            virtual_machine[path] = serialize_property(props.get(path))
+
+        _virtual_machines[vm_name] = virtual_machine
     return _virtual_machines
 
 
 def main():
 
     argument_spec = vmware_argument_spec()
+    argument_spec.update(dict(name=dict(default=None, type='str'),
+                              folder=dict(default=None, type='str'),
+                              properties=dict(default=[], type='list')))
     module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=False)
 
     if not HAS_PYVMOMI:
@@ -99,7 +193,10 @@ def main():
 
     try:
         content = connect_to_api(module)
-        _virtual_machines = get_all_virtual_machines(content)
+        _virtual_machines = get_all_virtual_machines(content,
+                                                     name=module.params['name'],
+                                                     folder=module.params['folder'],
+                                                     properties=module.params['properties'])
         module.exit_json(changed=False, virtual_machines=_virtual_machines)
     except vmodl.RuntimeFault as runtime_fault:
         module.fail_json(msg=runtime_fault.msg)
@@ -54,6 +54,20 @@ options:
         description:
             - Name of the portgroup to migrate to the virtual machine to
         required: True
+    inventory_cache_path:
+        description:
+            - Directory to keep the name to object index of the vCenter inventory in, so that the tasks of a play
+              don't each walk the inventory again. One file is kept per vCenter and user.
+            - Cached entries are checked before use and the index is rebuilt if one has gone stale.
+        required: False
+        default: null
+        version_added: 2.1
+    inventory_cache_ttl:
+        description:
+            - Seconds the index in C(inventory_cache_path) is used for
+        required: False
+        default: 60
+        version_added: 2.1
 '''
 
 EXAMPLES = '''
@@ -67,6 +81,12 @@ EXAMPLES = '''
     dvportgroup_name: distributed_portgroup_name
 '''
 
+import hashlib
+import json
+import os
+import tempfile
+import time
+
 try:
     from pyVmomi import vim, vmodl
     HAS_PYVMOMI = True
@@ -74,22 +94,134 @@ except ImportError:
     HAS_PYVMOMI = False
 
 
-def _find_dvspg_by_name(content, pg_name):
+class InventoryIndex(object):
+    """Index of the inventory objects of some types by type and name.
+
+    The index is built with one paged property collector query for the
+    name of every object, instead of reading the name of each
+    object lazily. It can be kept on disk for cache_ttl seconds, in one
+    file per scope (vCenter and user); objects found through a cached
+    index are checked and the index is rebuilt if they have gone stale.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, content, types, cache_path=None, cache_ttl=60, scope=''):
+        self.content = content
+        self.types = types
+        self.cache_file = None
+        self.cache_ttl = cache_ttl
+        if cache_path:
+            self.cache_file = os.path.join(os.path.expanduser(cache_path),
+                                           'vmware-inventory-%s.json' % hashlib.sha1(scope).hexdigest())
+        self._objects = None
+        self._from_cache = False
+
+    def _build(self):
+        objects = {}
+        view = self.content.viewManager.CreateContainerView(self.content.rootFolder, self.types, True)
+        try:
+            traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+                name='traverseView', path='view', skip=False, type=vim.view.ContainerView)
+            object_spec = vmodl.query.PropertyCollector.ObjectSpec(
+                obj=view, skip=True, selectSet=[traversal_spec])
+            property_specs = [vmodl.query.PropertyCollector.PropertySpec(
+                type=obj_type, pathSet=['name'], all=False) for obj_type in self.types]
+            filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+                objectSet=[object_spec], propSet=property_specs)
+            options = vmodl.query.PropertyCollector.RetrieveOptions(maxObjects=self.PAGE_SIZE)
+
+            collector = self.content.propertyCollector
+            result = collector.RetrievePropertiesEx([filter_spec], options)
+            while result:
+                for obj in result.objects:
+                    props = dict((prop.name, prop.val) for prop in obj.propSet)
+                    by_name = objects.setdefault(obj.obj._wsdlName, {})
+                    by_name.setdefault(props.get('name'), []).append(obj.obj._moId)
+                if not result.token:
+                    break
+                result = collector.ContinueRetrievePropertiesEx(result.token)
+        finally:
+            view.Destroy()
+        return objects
+
+    def _load(self, refresh=False):
+        if not refresh and self.cache_file:
+            try:
+                cache = json.load(open(self.cache_file))
+                if time.time() - cache['time'] < self.cache_ttl:
+                    self._objects = cache['objects']
+                    self._from_cache = True
+                    return
+            except (IOError, ValueError, KeyError):
+                pass
+
+        self._objects = self._build()
+        self._from_cache = False
+        if self.cache_file:
+            self._save()
+
+    def _save(self):
+        try:
+            dirname = os.path.dirname(self.cache_file)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump({'time': time.time(), 'objects': self._objects}, f)
+            finally:
+                f.close()
+            os.rename(tmp, self.cache_file)
+        except (IOError, OSError):
+            # the cache only saves time, failing to write it is no error
+            pass
+
+    def _lookup(self, obj_type, name):
+        moids = self._objects.get(obj_type._wsdlName, {}).get(name)
+        if moids:
+            return obj_type(moids[0], self.content.rootFolder._stub)
+        return None
+
+    def find(self, obj_type, name):
+        """Return the object of obj_type named name, or None."""
+        if self._objects is None:
+            self._load()
+        obj = self._lookup(obj_type, name)
+        if self._from_cache:
+            try:
+                stale = obj is None or obj.name != name
+            except vmodl.fault.ManagedObjectNotFound:
+                stale = True
+            if stale:
+                self._load(refresh=True)
+                obj = self._lookup(obj_type, name)
+        return obj
+
+
+# the inventory index of this run, built on first use
+_inventory = None
+
+
+def get_inventory(module, content):
+    """Return the inventory index of this run, shared by all lookups."""
+    global _inventory
+    if _inventory is None:
+        scope = '%s|%s' % (module.params['hostname'], module.params['username'])
+        _inventory = InventoryIndex(content,
+                                    [vim.VirtualMachine, vim.dvs.DistributedVirtualPortgroup],
+                                    cache_path=module.params['inventory_cache_path'],
+                                    cache_ttl=module.params['inventory_cache_ttl'],
+                                    scope=scope)
+    return _inventory
 
-    vmware_distributed_port_group = get_all_objs(content, [vim.dvs.DistributedVirtualPortgroup])
-    for dvspg in vmware_distributed_port_group:
-        if dvspg.name == pg_name:
-            return dvspg
-    return None
 
+def _find_dvspg_by_name(inventory, pg_name):
+    return inventory.find(vim.dvs.DistributedVirtualPortgroup, pg_name)
 
-def find_vm_by_name(content, vm_name):
 
-    virtual_machines = get_all_objs(content, [vim.VirtualMachine])
-    for vm in virtual_machines:
-        if vm.name == vm_name:
-            return vm
-    return None
+def find_vm_by_name(inventory, vm_name):
+    return inventory.find(vim.VirtualMachine, vm_name)
 
 
 def migrate_network_adapter_vds(module):
@@ -102,12 +234,13 @@ def migrate_network_adapter_vds(module):
     port = vim.dvs.PortConnection()
     devicespec = vim.vm.device.VirtualDeviceSpec()
 
-    pg = _find_dvspg_by_name(content, dvportgroup_name)
+    inventory = get_inventory(module, content)
+    pg = _find_dvspg_by_name(inventory, dvportgroup_name)
 
     if pg is None:
         module.fail_json(msg="The standard portgroup was not found")
 
-    vm = find_vm_by_name(content, vm_name)
+    vm = find_vm_by_name(inventory, vm_name)
     if vm is None:
         module.fail_json(msg="The virtual machine was not found")
 
@@ -137,7 +270,7 @@ def check_vm_network_state(module):
     try:
         content = connect_to_api(module)
         module.params['content'] = content
-        vm = find_vm_by_name(content, vm_name)
+        vm = find_vm_by_name(get_inventory(module, content), vm_name)
         module.params['vm'] = vm
         if vm is None:
             module.fail_json(msg="A virtual machine with name %s does not exist" % vm_name)
@@ -156,7 +289,9 @@ def main():
 
     argument_spec = vmware_argument_spec()
     argument_spec.update(dict(vm_name=dict(required=True, type='str'),
-                              dvportgroup_name=dict(required=True, type='str')))
+                              dvportgroup_name=dict(required=True, type='str'),
+                              inventory_cache_path=dict(default=None, type='str'),
+                              inventory_cache_ttl=dict(default=60, type='int')))
 
     module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=False)
     if not HAS_PYVMOMI:
@@ -41,8 +41,17 @@ options:
     required: true
   src:
     description:
-      - The file to push to vCenter
-    required: true
+      - The file to push to vCenter.
+      - If this is a directory, all files below it are pushed to the C(path) directory on the datastore,
+        keeping their relative paths.
+    required: false
+  files:
+    description:
+      - A list of local files to push into the C(path) directory on the datastore.
+      - Either this or C(src) is required.
+    required: false
+    default: null
+    version_added: 2.1
   datacenter:
     description:
       - The datacenter on the vCenter server that holds the datastore.
@@ -54,7 +63,40 @@ options:
   path:
     description:
       - The file to push to the datastore on the vCenter server.
+      - The directory to push to when C(src) is a directory or C(files) is used.
     required: true
+  compare:
+    description:
+      - How to find out that the datastore already has the file, in which case it is not uploaded again.
+      - C(size) compares the size of the files only.
+      - C(checksum) also compares the SHA1 checksum of the local file with the one kept in a C(.sha1) file
+        next to the file on the datastore, which is written after each upload.
+      - C(none) always uploads.
+    required: false
+    default: none
+    choices: [ 'none', 'size', 'checksum' ]
+    version_added: 2.1
+  retries:
+    description:
+      - Number of times an upload that failed on a connection error or a server error is retried.
+    required: false
+    default: 3
+    version_added: 2.1
+  resume:
+    description:
+      - On retry, only send the part of the file the datastore does not have yet, if the datastore accepts
+        ranged writes. Otherwise, or if the datastore does not end up with the whole file, the upload
+        starts over.
+      - Only resume when nothing else writes to the same file on the datastore.
+    required: false
+    default: true
+    version_added: 2.1
+  workers:
+    description:
+      - Number of files uploaded at the same time, each over its own connection, when pushing several files.
+    required: false
+    default: 4
+    version_added: 2.1
 notes:
   - "This module ought to be run from a system that can access vCenter directly and has the file to transfer.
     It can be the normal remote target or you can change it either by using C(transport: local) or using C(delegate_to)."
@@ -66,16 +108,38 @@ EXAMPLES = '''
   transport: local
 - vsphere_copy: host=vhost login=vuser password=vpass src=/other/local/file datacenter='DC2 Someplace' datastore=datastore2 path=other/remote/file
   delegate_to: other_system
+- vsphere_copy: host=vhost login=vuser password=vpass src=/some/local/isos datacenter='DC1 Someplace' datastore=datastore1 path=isos compare=checksum
+  transport: local
+- vsphere_copy:
+    host: vhost
+    login: vuser
+    password: vpass
+    files:
+      - /some/local/disk.vmdk
+      - /some/local/disk-flat.vmdk
+    datacenter: 'DC1 Someplace'
+    datastore: datastore1
+    path: vms/disk
+    compare: size
+  transport: local
 '''
 
-import atexit
+import Queue
 import base64
+import hashlib
 import httplib
+import os
+import posixpath
+import threading
+import time
 import urllib
-import mmap
 import errno
 import socket
 
+# files are streamed in chunks of this size, so memory use does not grow with their size
+CHUNK_SIZE = 1024 * 1024
+RETRY_DELAY_MAX = 30
+
 def vmware_path(datastore, datacenter, path):
     ''' Constructs a URL path that VSphere accepts reliably '''
     path = "/folder/%s" % path.lstrip("/")
@@ -90,6 +154,234 @@ def vmware_path(datastore, datacenter, path):
     params = urllib.urlencode(params)
     return "%s?%s" % (path, params)
 
+class UploadError(Exception):
+    def __init__(self, msg, **details):
+        Exception.__init__(self, msg)
+        self.details = details
+
+
+class DatastoreUploader(object):
+    ''' Uploads files to a datastore over one kept alive connection '''
+
+    def __init__(self, host, login, password, datacenter, datastore, compare='none', retries=3, resume=True):
+        self.host = host
+        self.auth = 'Basic %s' % base64.encodestring('%s:%s' % (login, password)).rstrip()
+        self.datacenter = datacenter
+        self.datastore = datastore
+        self.compare = compare
+        self.retries = retries
+        self.resume = resume
+        self.conn = None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = httplib.HTTPSConnection(self.host)
+        return self.conn
+
+    def _request(self, method, remote_path, body=None):
+        ''' Small request, retried once as the kept alive connection may have been closed '''
+        headers = { "Authorization": self.auth }
+        if body is not None:
+            headers["Content-Type"] = "application/octet-stream"
+        for attempt in range(2):
+            try:
+                conn = self._connect()
+                conn.request(method, remote_path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp, resp.read()
+            except (httplib.HTTPException, socket.error), e:
+                self.close()
+                if attempt:
+                    raise UploadError(str(e), reason=str(e))
+
+    def remote_size(self, remote_path):
+        ''' Size of the file on the datastore, None if there is none '''
+        resp, data = self._request("HEAD", remote_path)
+        if resp.status == 404:
+            return None
+        if resp.status not in range(200, 300):
+            raise UploadError('Failed to query datastore', status=resp.status, reason=resp.reason)
+        length = resp.getheader('content-length')
+        if length is None:
+            return None
+        return int(length)
+
+    def remote_checksum(self, dest):
+        resp, data = self._request("GET", vmware_path(self.datastore, self.datacenter, dest + '.sha1'))
+        if resp.status not in range(200, 300):
+            return None
+        return data.strip()
+
+    def _put(self, remote_path, src, offset, size):
+        ''' Streams src from offset to the datastore, returns the response '''
+        conn = self._connect()
+        conn.putrequest("PUT", remote_path, skip_accept_encoding=True)
+        conn.putheader("Content-Type", "application/octet-stream")
+        conn.putheader("Content-Length", str(size - offset))
+        conn.putheader("Authorization", self.auth)
+        if offset:
+            conn.putheader("Content-Range", "bytes %d-%d/%d" % (offset, size - 1, size))
+        conn.endheaders()
+
+        fd = open(src, "rb")
+        try:
+            fd.seek(offset)
+            while True:
+                chunk = fd.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                conn.send(chunk)
+        finally:
+            fd.close()
+
+        resp = conn.getresponse()
+        resp.read()
+        return resp
+
+    def upload(self, src, dest):
+        ''' Uploads src to dest unless the datastore has it already, returns the result of the file '''
+        remote_path = vmware_path(self.datastore, self.datacenter, dest)
+        # URL is only used in JSON output (helps troubleshooting)
+        url = 'https://%s%s' % (self.host, remote_path)
+        result = dict(src=src, dest=dest, url=url, changed=False)
+
+        size = os.path.getsize(src)
+        checksum = None
+        initial_size = None
+        if self.compare != 'none' or self.resume:
+            initial_size = self.remote_size(remote_path)
+        if self.compare != 'none' and initial_size == size:
+            if self.compare == 'size':
+                return result
+            checksum = file_checksum(src)
+            if self.remote_checksum(dest) == checksum:
+                return result
+
+        ranged = self.resume
+        offset = 0
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt, RETRY_DELAY_MAX))
+                offset = 0
+                if ranged:
+                    # only resume from what this upload wrote, never from an older file
+                    current = self.remote_size(remote_path)
+                    if current and current != initial_size and current < size:
+                        offset = current
+
+            try:
+                resp = self._put(remote_path, src, offset, size)
+            except (httplib.HTTPException, socket.error), e:
+                self.close()
+                if isinstance(e, socket.error) and isinstance(e.args, tuple) and e[0] == errno.ECONNRESET:
+                    # VSphere resets connection if the file is in use and cannot be replaced
+                    error = UploadError('Failed to upload, image probably in use', status=e[0], reason=str(e))
+                else:
+                    error = UploadError(str(e), status=getattr(e, 'errno', None), reason=str(e))
+                continue
+
+            if resp.status in range(200, 300):
+                if offset and self.remote_size(remote_path) != size:
+                    # the datastore did not take the range, start over
+                    ranged = False
+                    error = UploadError('Datastore does not support resuming uploads', status=resp.status, reason=resp.reason)
+                    continue
+                result.update(changed=True, status=resp.status, reason=resp.reason)
+                break
+
+            error = UploadError('Failed to upload', status=resp.status, reason=resp.reason, length=resp.length,
+                                version=resp.version, headers=resp.getheaders(), chunked=resp.chunked)
+            if offset and resp.status in (400, 416, 501):
+                ranged = False
+            elif resp.status < 500:
+                break
+
+        if not result['changed']:
+            error.details['url'] = url
+            raise error
+
+        if self.compare == 'checksum':
+            if checksum is None:
+                checksum = file_checksum(src)
+            resp, data = self._request("PUT", vmware_path(self.datastore, self.datacenter, dest + '.sha1'), body=checksum + '\n')
+            if resp.status not in range(200, 300):
+                raise UploadError('Failed to upload checksum file', status=resp.status, reason=resp.reason, url=url)
+
+        return result
+
+
+def file_checksum(path):
+    sha1 = hashlib.sha1()
+    fd = open(path, "rb")
+    try:
+        while True:
+            chunk = fd.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sha1.update(chunk)
+    finally:
+        fd.close()
+    return sha1.hexdigest()
+
+
+def list_transfers(src, files, dest):
+    ''' Returns the (local file, datastore path) pairs to upload '''
+    if files:
+        return [ (path, posixpath.join(dest, os.path.basename(path))) for path in files ]
+    if not os.path.isdir(src):
+        return [ (src, dest) ]
+    transfers = []
+    for root, dirs, names in os.walk(src):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            relpath = os.path.relpath(path, src).replace(os.sep, '/')
+            transfers.append((path, posixpath.join(dest, relpath)))
+    return transfers
+
+
+def upload_all(params, transfers, workers):
+    ''' Uploads the transfers on a pool of workers, each keeping its connection alive '''
+    results = [ None ] * len(transfers)
+    work = Queue.Queue()
+    for index, transfer in enumerate(transfers):
+        work.put((index, transfer))
+
+    def worker():
+        uploader = DatastoreUploader(**params)
+        try:
+            while True:
+                try:
+                    index, (src, dest) = work.get_nowait()
+                except Queue.Empty:
+                    break
+                try:
+                    results[index] = uploader.upload(src, dest)
+                except UploadError, e:
+                    uploader.close()
+                    results[index] = dict(src=src, dest=dest, changed=False, failed=True, msg=str(e), **e.details)
+                except (IOError, OSError), e:
+                    results[index] = dict(src=src, dest=dest, changed=False, failed=True, msg=str(e))
+        finally:
+            uploader.close()
+
+    threads = []
+    for i in range(max(1, min(workers, len(transfers)))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return results
+
+
 def main():
 
     module = AnsibleModule(
@@ -97,58 +389,62 @@ def main():
             host = dict(required=True, aliases=[ 'hostname' ]),
             login = dict(required=True, aliases=[ 'username' ]),
             password = dict(required=True),
-            src = dict(required=True, aliases=[ 'name' ]),
+            src = dict(required=False, aliases=[ 'name' ]),
+            files = dict(required=False, type='list'),
             datacenter = dict(required=True),
             datastore = dict(required=True),
             dest = dict(required=True, aliases=[ 'path' ]),
+            compare = dict(default='none', choices=[ 'none', 'size', 'checksum' ]),
+            retries = dict(default=3, type='int'),
+            resume = dict(default=True, type='bool'),
+            workers = dict(default=4, type='int'),
         ),
+        required_one_of = [ [ 'src', 'files' ] ],
+        mutually_exclusive = [ [ 'src', 'files' ] ],
         # Implementing check-mode using HEAD is impossible, since size/date is not 100% reliable
         supports_check_mode = False,
     )
 
-    host = module.params.get('host')
-    login = module.params.get('login')
-    password = module.params.get('password')
     src = module.params.get('src')
-    datacenter = module.params.get('datacenter')
-    datastore = module.params.get('datastore')
+    files = module.params.get('files')
     dest = module.params.get('dest')
 
-    fd = open(src, "rb")
-    atexit.register(fd.close)
-
-    data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
-    atexit.register(data.close)
-
-    conn = httplib.HTTPSConnection(host)
-    atexit.register(conn.close)
+    if module.params.get('retries') < 0:
+        module.fail_json(msg='retries must be 0 or more')
+    if module.params.get('workers') < 1:
+        module.fail_json(msg='workers must be a positive integer')
 
-    remote_path = vmware_path(datastore, datacenter, dest)
-    auth = base64.encodestring('%s:%s' % (login, password)).rstrip()
-    headers = {
-        "Content-Type": "application/octet-stream",
-        "Content-Length": str(len(data)),
-        "Authorization": "Basic %s" % auth,
-    }
+    params = dict(
+        host = module.params.get('host'),
+        login = module.params.get('login'),
+        password = module.params.get('password'),
+        datacenter = module.params.get('datacenter'),
+        datastore = module.params.get('datastore'),
+        compare = module.params.get('compare'),
+        retries = module.params.get('retries'),
+        resume = module.params.get('resume'),
+    )
 
-    # URL is only used in JSON output (helps troubleshooting)
-    url = 'https://%s%s' % (host, remote_path)
+    if files or os.path.isdir(src):
+        results = upload_all(params, list_transfers(src, files, dest), module.params.get('workers'))
+        changed = any(result['changed'] for result in results)
+        failed = [ result for result in results if result.get('failed') ]
+        if failed:
+            module.fail_json(msg='Failed to upload %d of %d files' % (len(failed), len(results)), changed=changed, results=results)
+        module.exit_json(changed=changed, results=results)
 
+    uploader = DatastoreUploader(**params)
     try:
-        conn.request("PUT", remote_path, body=data, headers=headers)
-    except socket.error, e:
-        if isinstance(e.args, tuple) and e[0] == errno.ECONNRESET:
-            # VSphere resets connection if the file is in use and cannot be replaced
-            module.fail_json(msg='Failed to upload, image probably in use', status=e[0], reason=str(e), url=url)
-        else:
-            module.fail_json(msg=str(e), status=e[0], reason=str(e), url=url)
-
-    resp = conn.getresponse()
-
-    if resp.status in range(200, 300):
-        module.exit_json(changed=True, status=resp.status, reason=resp.reason, url=url)
-    else:
-        module.fail_json(msg='Failed to upload', status=resp.status, reason=resp.reason, length=resp.length, version=resp.version, headers=resp.getheaders(), chunked=resp.chunked, url=url)
+        result = uploader.upload(src, dest)
+    except UploadError, e:
+        module.fail_json(msg=str(e), **e.details)
+    except (IOError, OSError), e:
+        module.fail_json(msg=str(e))
+    finally:
+        uploader.close()
+    del result['src'], result['dest']
+    module.exit_json(**result)
+
 
 # Import module snippets
 from ansible.module_utils.basic import *
@@ -23,6 +23,7 @@ description:
   - "The M(nagios) module has two basic functions: scheduling downtime and toggling alerts for services or hosts."
   - All actions require the I(host) parameter to be given explicitly. In playbooks you can use the C({{inventory_hostname}}) variable to refer to the host the playbook is currently running on.
   - You can specify multiple services at once by separating them with commas, .e.g., C(services=httpd,nfs,puppet).
+  - You can likewise act on multiple hosts or servicegroups at once, e.g., C(host=web1,web2,web3). The commands for every target are built first and written to the command file together, in as few writes as possible.
   - When specifying what service to handle there is a special service value, I(host), which will handle alerts/downtime for the I(host itself), e.g., C(service=host). This keyword may not be given with other services at the same time. I(Setting alerts/downtime for a host does not affect alerts/downtime for any of the services running on it.) To schedule downtime for all services on particular host use keyword "all", e.g., C(service=all).
   - When using the M(nagios) module you will need to specify your Nagios server using the C(delegate_to) parameter.
 version_added: "0.7"
@@ -38,7 +39,7 @@ options:
                "servicegroup_host_downtime" ]
   host:
     description:
-      - Host to operate on in Nagios.
+      - Host to operate on in Nagios. Separate multiple hosts with commas.
     required: false
     default: null
   cmdfile:
@@ -47,6 +48,30 @@ options:
         Only required if auto-detection fails.
     required: false
     default: auto-detected
+  status_file:
+    version_added: "2.1"
+    description:
+      - Path to the nagios I(status file) (C(status.dat)). Hosts and services
+        already in the requested state are looked up in it and no command is
+        sent for them, so the module only reports a change when it sends one.
+      - When the file cannot be found every command is sent.
+    required: false
+    default: auto-detected
+  object_cache_file:
+    version_added: "2.1"
+    description:
+      - Path to the nagios I(object cache file) (C(objects.cache)), used to
+        look up the members of a servicegroup.
+    required: false
+    default: auto-detected
+  force:
+    version_added: "2.1"
+    description:
+      - Send every command even if the status file shows it would not
+        change anything, e.g. to replace an existing downtime.
+    required: false
+    default: "no"
+    choices: [ "yes", "no" ]
   author:
     description:
      - Author to leave downtime comments as.
@@ -76,7 +101,7 @@ options:
   servicegroup:
     version_added: "2.0"
     description:
-      - The Servicegroup we want to set downtimes/alerts for.
+      - The Servicegroup we want to set downtimes/alerts for. Separate multiple servicegroups with commas.
         B(Required) option when using the C(servicegroup_service_downtime) amd C(servicegroup_host_downtime).
   command:
     description:
@@ -107,6 +132,9 @@ EXAMPLES = '''
 # schedule downtime for a few services
 - nagios: action=downtime services=frob,foobar,qeuz host={{ inventory_hostname }}
 
+# schedule downtime for ALL services on every host of a group, in one go
+- nagios: action=downtime minutes=60 service=all host={{ groups['webservers'] | join(',') }}
+
 # set 30 minutes downtime for all services in servicegroup foo
 - nagios: action=servicegroup_service_downtime minutes=30 servicegroup=foo host={{ inventory_hostname }}
 
@@ -141,12 +169,21 @@ EXAMPLES = '''
 import ConfigParser
 import types
 import time
+import os
 import os.path
+import select
+
+# Writes to a pipe of at most PIPE_BUF bytes are atomic.
+PIPE_BUF = getattr(select, 'PIPE_BUF', 512)
 
 ######################################################################
 
 
-def which_cmdfile():
+def which_cfg_value(key):
+    """
+    The value of `key` in the first nagios.cfg found that sets it
+    """
+
     locations = [
         # rhel
         '/etc/nagios/nagios.cfg',
@@ -174,11 +211,134 @@ def which_cmdfile():
     for path in locations:
         if os.path.exists(path):
             for line in open(path):
-                if line.startswith('command_file'):
-                    return line.split('=')[1].strip()
+                if line.split('=')[0].strip() == key:
+                    return line.split('=', 1)[1].strip()
 
     return None
 
+
+def which_cmdfile():
+    return which_cfg_value('command_file')
+
+
+def which_status_file():
+    return which_cfg_value('status_file')
+
+
+def which_object_cache_file():
+    return which_cfg_value('object_cache_file')
+
+
+class NagiosStatus(object):
+    """
+    Index of the Nagios status.dat and objects.cache files.
+
+    Both files are read a line at a time and only the handful of
+    attributes the module looks at are kept, so status files of
+    several hundred megabytes are never held in memory whole. Every
+    question is then answered with a dictionary lookup. Hosts and
+    services the files don't know about are never reported as being
+    in any particular state.
+    """
+
+    STATUS_KEYS = ['host_name', 'service_description',
+                   'notifications_enabled', 'enable_notifications',
+                   'scheduled_downtime_depth']
+    OBJECT_KEYS = ['servicegroup_name', 'members']
+
+    def __init__(self, status_file=None, object_cache_file=None):
+        self.program = {}
+        self.host_state = {}
+        self.service_state = {}
+        self.host_services = {}
+        self.servicegroups = {}
+
+        if status_file and os.path.exists(status_file):
+            self._read_status(status_file)
+        if object_cache_file and os.path.exists(object_cache_file):
+            self._read_objects(object_cache_file)
+
+    def _blocks(self, path, wanted, keys, sep):
+        """
+        Yield (block type, attributes) for every block of a type in
+        `wanted`, keeping only the attributes in `keys`.
+        """
+
+        block = None
+        attrs = None
+        for line in open(path):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if block is None:
+                if line.endswith('{'):
+                    block = line[:-1].strip()
+                    if block.startswith('define '):
+                        block = block[len('define '):].strip()
+                    attrs = {}
+                continue
+            if line == '}':
+                if block in wanted:
+                    yield block, attrs
+                block = None
+                continue
+            if block in wanted:
+                parts = line.split(sep, 1)
+                if len(parts) == 2 and parts[0].strip() in keys:
+                    attrs[parts[0].strip()] = parts[1].strip()
+
+    def _state(self, attrs):
+        return {
+            'notifications_enabled': attrs.get('notifications_enabled') == '1',
+            'in_downtime': int(attrs.get('scheduled_downtime_depth') or 0) > 0,
+            }
+
+    def _read_status(self, path):
+        wanted = ['programstatus', 'info', 'hoststatus', 'servicestatus']
+        for block, attrs in self._blocks(path, wanted, self.STATUS_KEYS, '='):
+            if block == 'programstatus':
+                self.program = {
+                    'notifications_enabled': attrs.get('enable_notifications') == '1',
+                    }
+            elif block == 'hoststatus':
+                self.host_state[attrs.get('host_name')] = self._state(attrs)
+            elif block == 'servicestatus':
+                host = attrs.get('host_name')
+                service = attrs.get('service_description')
+                self.service_state[(host, service)] = self._state(attrs)
+                self.host_services.setdefault(host, []).append(service)
+
+    def _read_objects(self, path):
+        wanted = ['servicegroup']
+        for block, attrs in self._blocks(path, wanted, self.OBJECT_KEYS, None):
+            members = [m.strip() for m in attrs.get('members', '').split(',')]
+            self.servicegroups[attrs.get('servicegroup_name')] = \
+                zip(members[0::2], members[1::2])
+
+    def nagios_is(self, key, value):
+        return self.program.get(key) is value
+
+    def host_is(self, host, key, value):
+        return self.host_state.get(host, {}).get(key) is value
+
+    def service_is(self, host, service, key, value):
+        return self.service_state.get((host, service), {}).get(key) is value
+
+    def services_of(self, host):
+        """
+        The services of a host, or None if the host is unknown
+        """
+
+        return self.host_services.get(host)
+
+    def servicegroup_members(self, servicegroup):
+        """
+        The (host, service) members of a servicegroup, or None if the
+        servicegroup is unknown
+        """
+
+        return self.servicegroups.get(servicegroup)
+
 ######################################################################
 
 
@@ -206,6 +366,9 @@ def main():
             servicegroup=dict(required=False, default=None),
             minutes=dict(default=30),
             cmdfile=dict(default=which_cmdfile()),
+            status_file=dict(default=which_status_file()),
+            object_cache_file=dict(default=which_object_cache_file()),
+            force=dict(default=False, type='bool'),
             services=dict(default=None, aliases=['service']),
             command=dict(required=False, default=None),
             )
@@ -303,17 +466,37 @@ class Nagios(object):
         self.author = kwargs['author']
         self.comment = kwargs['comment']
         self.host = kwargs['host']
+        self.hosts = self._split_targets(kwargs['host'])
         self.servicegroup = kwargs['servicegroup']
+        self.servicegroups = self._split_targets(kwargs['servicegroup'])
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
         self.command = kwargs['command']
 
+        if kwargs['force']:
+            self.status = NagiosStatus()
+        else:
+            self.status = NagiosStatus(kwargs['status_file'],
+                                       kwargs['object_cache_file'])
+
         if (kwargs['services'] is None) or (kwargs['services'] == 'host') or (kwargs['services'] == 'all'):
             self.services = kwargs['services']
         else:
             self.services = kwargs['services'].split(',')
 
         self.command_results = []
+        self.pending_commands = []
+
+    def _split_targets(self, targets):
+        """
+        A comma separated string (or list) of targets as a list
+        """
+
+        if targets is None:
+            return []
+        if isinstance(targets, basestring):
+            targets = targets.split(',')
+        return [target.strip() for target in targets if target.strip()]
 
     def _now(self):
         """
@@ -324,19 +507,47 @@ class Nagios(object):
 
     def _write_command(self, cmd):
         """
-        Write the given command to the Nagios command file
+        Queue the given command for the Nagios command file. Queued
+        commands are written by _flush_commands.
         """
 
+        self.pending_commands.append(cmd)
+        return True
+
+    def _flush_commands(self):
+        """
+        Write every queued command to the Nagios command file, opening
+        it once. Commands are packed into writes of at most PIPE_BUF
+        bytes so that no command gets interleaved with another writer.
+        """
+
+        if not self.pending_commands:
+            return
+
+        chunks = []
+        chunk = ''
+        for cmd in self.pending_commands:
+            if chunk and len(chunk) + len(cmd) > PIPE_BUF:
+                chunks.append(chunk)
+                chunk = ''
+            chunk += cmd
+        chunks.append(chunk)
+
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            fd = os.open(self.cmdfile, os.O_WRONLY | os.O_CREAT)
+            try:
+                for chunk in chunks:
+                    while chunk:
+                        chunk = chunk[os.write(fd, chunk):]
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
 
+        self.command_results.extend([cmd.strip() for cmd in self.pending_commands])
+        self.pending_commands = []
+
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment=None, start=None,
                     svc=None, fixed=1, trigger=0):
@@ -884,50 +1095,113 @@ class Nagios(object):
         """
         Figure out what you want to do from ansible, and then do the
         needful (at the earliest).
+
+        The commands for every host or servicegroup given are queued
+        first and written to the command file together. Commands that
+        the status file shows would change nothing are left out.
         """
+        if self.action in ['servicegroup_host_downtime', 'servicegroup_service_downtime']:
+            for servicegroup in self.servicegroups:
+                self._act(None, servicegroup)
+        elif self.action in ['silence_nagios', 'unsilence_nagios', 'command']:
+            self._act(None, None)
+        else:
+            for host in self.hosts:
+                self._act(host, None)
+
+        self._flush_commands()
+
+        self.module.exit_json(nagios_commands=self.command_results,
+                              changed=bool(self.command_results))
+
+    def _act(self, host, servicegroup):
+        """
+        Queue the commands of the requested action for one host or
+        servicegroup.
+        """
+        status = self.status
+
         # host or service downtime?
         if self.action == 'downtime':
             if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
+                if not status.host_is(host, 'in_downtime', True):
+                    self.schedule_host_downtime(host, self.minutes)
             elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
+                services = status.services_of(host)
+                if services is None:
+                    self.schedule_host_svc_downtime(host, self.minutes)
+                else:
+                    pending = [s for s in services
+                               if not status.service_is(host, s, 'in_downtime', True)]
+                    if len(pending) == len(services):
+                        self.schedule_host_svc_downtime(host, self.minutes)
+                    else:
+                        self.schedule_svc_downtime(host,
+                                                   services=pending,
+                                                   minutes=self.minutes)
             else:
-                self.schedule_svc_downtime(self.host,
-                                           services=self.services,
+                pending = [s for s in self.services
+                           if not status.service_is(host, s, 'in_downtime', True)]
+                self.schedule_svc_downtime(host,
+                                           services=pending,
                                            minutes=self.minutes)
         elif self.action == "servicegroup_host_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+            if servicegroup:
+                members = status.servicegroup_members(servicegroup)
+                if members is None or [h for h, s in members
+                                       if not status.host_is(h, 'in_downtime', True)]:
+                    self.schedule_servicegroup_host_downtime(servicegroup = servicegroup, minutes = self.minutes)
         elif self.action == "servicegroup_service_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+            if servicegroup:
+                members = status.servicegroup_members(servicegroup)
+                if members is None or [s for h, s in members
+                                       if not status.service_is(h, s, 'in_downtime', True)]:
+                    self.schedule_servicegroup_svc_downtime(servicegroup = servicegroup, minutes = self.minutes)
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            services = status.services_of(host)
+            if services is None or [s for s in services
+                                    if not status.service_is(host, s, 'notifications_enabled', False)]:
+                self.disable_host_svc_notifications(host)
+            if not status.host_is(host, 'notifications_enabled', False):
+                self.disable_host_notifications(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            services = status.services_of(host)
+            if services is None or [s for s in services
+                                    if not status.service_is(host, s, 'notifications_enabled', True)]:
+                self.enable_host_svc_notifications(host)
+            if not status.host_is(host, 'notifications_enabled', True):
+                self.enable_host_notifications(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
             if self.services == 'host':
-                self.enable_host_notifications(self.host)
+                if not status.host_is(host, 'notifications_enabled', True):
+                    self.enable_host_notifications(host)
             else:
-                self.enable_svc_notifications(self.host,
-                                              services=self.services)
+                pending = [s for s in self.services
+                           if not status.service_is(host, s, 'notifications_enabled', True)]
+                self.enable_svc_notifications(host,
+                                              services=pending)
 
         elif self.action == 'disable_alerts':
             if self.services == 'host':
-                self.disable_host_notifications(self.host)
+                if not status.host_is(host, 'notifications_enabled', False):
+                    self.disable_host_notifications(host)
             else:
-                self.disable_svc_notifications(self.host,
-                                               services=self.services)
+                pending = [s for s in self.services
+                           if not status.service_is(host, s, 'notifications_enabled', False)]
+                self.disable_svc_notifications(host,
+                                               services=pending)
         elif self.action == 'silence_nagios':
-            self.silence_nagios()
+            if not status.nagios_is('notifications_enabled', False):
+                self.silence_nagios()
 
         elif self.action == 'unsilence_nagios':
-            self.unsilence_nagios()
+            if not status.nagios_is('notifications_enabled', True):
+                self.unsilence_nagios()
 
         elif self.action == 'command':
             self.nagios_cmd(self.command)
@@ -937,9 +1211,6 @@ class Nagios(object):
             self.module.fail_json(msg="unknown action specified: '%s'" % \
                                       self.action)
 
-        self.module.exit_json(nagios_commands=self.command_results,
-                              changed=True)
-
 ######################################################################
 # import module snippets
 from ansible.module_utils.basic import *
@@ -90,6 +90,67 @@ options:
         default: null
         choices: []
         aliases: []
+    workers:
+        description:
+            - Number of concurrent iControl sessions used to collect facts.
+              When greater than 1, the requested fact categories and their
+              attribute queries are fanned out over a pool of session-scoped
+              connections of this size instead of being collected one after
+              another over a single connection.
+        required: false
+        default: 1
+        choices: []
+        aliases: []
+        version_added: "2.1"
+    fields:
+        description:
+            - Dictionary of fact category to the list of attributes to
+              collect for it, for example C({virtual_server: [destination,
+              enabled_state]}). Only the matching iControl queries are issued;
+              categories not listed collect every attribute. Not applicable
+              for certificate, key and software fact categories.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "2.1"
+    cache_path:
+        description:
+            - Directory holding on-disk fact snapshots, one per I(server) and
+              I(filter). When set, categories whose snapshot is younger than
+              their I(cache_ttl) are served from the snapshot without
+              contacting the BIG-IP, and only expired categories are
+              re-collected.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "2.1"
+    cache_ttl:
+        description:
+            - Dictionary of fact category to snapshot lifetime in seconds,
+              merged over the defaults of 3600 for C(certificate), C(device),
+              C(device_group), C(key), C(software) and C(system_info) and 0
+              (always re-collect) for every other category. Only used with
+              I(cache_path).
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "2.1"
+    cache_refresh:
+        description:
+            - How expired categories are re-collected. C(full) re-queries
+              every object. C(changed) lists the object names and only
+              queries the attributes of objects missing from the snapshot;
+              objects that were removed are dropped and objects still present
+              keep their snapshot attributes. Not applicable for certificate,
+              key, software and system_info fact categories.
+        required: false
+        default: full
+        choices: ['full', 'changed']
+        aliases: []
+        version_added: "2.1"
 '''
 
 EXAMPLES = '''
@@ -109,6 +170,36 @@ EXAMPLES = '''
       password=mysecret
       include=interface,vlan
 
+  - name: Collect BIG-IP facts over 8 concurrent iControl sessions
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=virtual_server,pool,node
+      workers=8
+
+  - name: Collect BIG-IP facts, re-using snapshots and only querying new objects
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=software,system_info,virtual_server,pool
+      cache_path=/var/cache/bigip_facts
+      cache_refresh=changed
+
+  - name: Collect only pool member status and virtual server destinations
+    local_action:
+      module: bigip_facts
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      include: virtual_server,pool
+      fields:
+        virtual_server: [destination, enabled_state]
+        pool: [member, object_status]
+
 '''
 
 try:
@@ -120,8 +211,16 @@ else:
     bigsuds_found = True
 
 import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import time
 import traceback
 import re
+import sys
+import threading
+import Queue
 
 # ===========================================
 # bigip_facts module specific support methods.
@@ -166,6 +265,103 @@ class F5(object):
         return self.api.System.Session.get_active_folder()
 
 
+class F5Pool(object):
+    """F5 iControl session pool class.
+
+    Bounded pool of session-scoped F5 iControl clients. Stands in for an F5
+    instance; every iControl call made through get_api() borrows a client
+    from the pool for the duration of that single call.
+
+    Attributes:
+        size: Number of session-scoped clients in the pool.
+        clients: Queue of idle F5 instances.
+    """
+
+    def __init__(self, host, user, password, size):
+        self.size = size
+        self.clients = Queue.Queue()
+        for i in range(size):
+            f5 = F5(host, user, password, session=True)
+            f5.set_active_folder("/")
+            f5.enable_recursive_query_state()
+            self.clients.put(f5)
+
+    def get_api(self):
+        return PooledAPI(self)
+
+    def acquire(self):
+        return self.clients.get()
+
+    def release(self, f5):
+        self.clients.put(f5)
+
+    def map(self, func, items):
+        """Apply func to every item using at most size threads.
+
+        Results are returned in item order. The first exception raised by
+        func is re-raised in the calling thread once all workers finish.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        errors = []
+        work = Queue.Queue()
+        for index, item in enumerate(items):
+            work.put((index, item))
+
+        def worker():
+            while True:
+                try:
+                    index, item = work.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[index] = func(item)
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(self.size, len(items)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return results
+
+
+class PooledAPI(object):
+    """Pooled iControl API class.
+
+    Mirrors the bigsuds.BIGIP attribute path (e.g. api.LocalLB.Pool.get_list)
+    and runs the final call on a client borrowed from an F5Pool.
+
+    Attributes:
+        pool: F5Pool instance serving the calls.
+        path: Attribute names traversed so far.
+    """
+
+    def __init__(self, pool, path=()):
+        self.pool = pool
+        self.path = path
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return PooledAPI(self.pool, self.path + (name,))
+
+    def __call__(self, *args, **kwargs):
+        f5 = self.pool.acquire()
+        try:
+            target = f5.get_api()
+            for name in self.path:
+                target = getattr(target, name)
+            return target(*args, **kwargs)
+        finally:
+            self.pool.release(f5)
+
+
 class Interfaces(object):
     """Interfaces class.
 
@@ -1364,167 +1560,295 @@ class SystemInfo(object):
         return self.api.System.SystemInfo.get_uptime()
 
 
-def generate_dict(api_obj, fields):
+class FactCache(object):
+    """Fact snapshot cache class.
+
+    On-disk JSON snapshot of the facts previously collected from one BIG-IP
+    with one filter and field projection, stamped with the collection time of each category.
+
+    Attributes:
+        path: Snapshot file path.
+        snapshot: Dict of fact category to its timestamp and facts.
+    """
+
+    def __init__(self, cache_path, server, fact_filter=None, fields=None):
+        key = hashlib.sha1("%s|%s|%s" % (server, fact_filter or '',
+                                         json.dumps(fields, sort_keys=True))).hexdigest()
+        self.path = os.path.join(os.path.expanduser(cache_path),
+                                 "%s-%s.json" % (server, key[:12]))
+        try:
+            f = open(self.path)
+            try:
+                self.snapshot = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            self.snapshot = {}
+
+    def get_facts(self, category):
+        entry = self.snapshot.get(category)
+        if entry is None:
+            return None
+        return entry['facts']
+
+    def is_fresh(self, category, ttl):
+        entry = self.snapshot.get(category)
+        return entry is not None and time.time() - entry['timestamp'] < ttl
+
+    def update(self, category, facts):
+        self.snapshot[category] = {'timestamp': time.time(), 'facts': facts}
+
+    def save(self):
+        cache_dir = os.path.dirname(self.path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0700)
+        # snapshots may hold passphrases; mkstemp creates the file 0600
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        f = os.fdopen(fd, 'w')
+        try:
+            json.dump(self.snapshot, f)
+        finally:
+            f.close()
+        os.rename(tmp_path, self.path)
+
+
+def restrict_list(api_obj, names):
+    """Narrow the object names api_obj queries attributes for."""
+    current = api_obj.get_list()
+    for attr, value in vars(api_obj).items():
+        if value is current:
+            setattr(api_obj, attr, names)
+
+def fetch_fields(api_obj, fields):
+    """Call the getter of every field, skipping unsupported ones.
+
+    Returns a list of (field, response) tuples in field order. When api_obj
+    is bound to a pooled API the getters are issued concurrently.
+    """
+    def fetch(field):
+        try:
+            return (field, getattr(api_obj, "get_" + field)())
+        except (MethodNotFound, WebFault):
+            return None
+
+    if isinstance(api_obj.api, PooledAPI):
+        responses = api_obj.api.pool.map(fetch, fields)
+    else:
+        responses = map(fetch, fields)
+    return [response for response in responses if response is not None]
+
+def project_fields(fields, projection):
+    """Return the fields selected by projection, in fields order."""
+    if projection is None:
+        return fields
+    unknown = [field for field in projection if field not in fields]
+    if unknown:
+        raise ValueError("unknown field(s) %s, expected one or more of: %s"
+                         % (",".join(unknown), ",".join(fields)))
+    return [field for field in fields if field in projection]
+
+def generate_dict(api_obj, fields, snapshot=None, projection=None):
+    fields = project_fields(fields, projection)
     result_dict = {}
     lists = []
     supported_fields = []
+    if snapshot:
+        # only objects missing from the snapshot are queried
+        names = api_obj.get_list()
+        result_dict.update([(name, snapshot[name]) for name in names if name in snapshot])
+        restrict_list(api_obj, [name for name in names if name not in snapshot])
     if api_obj.get_list():
-        for field in fields:
-            try:
-                api_response = getattr(api_obj, "get_" + field)()
-            except (MethodNotFound, WebFault):
-                pass
-            else:
-                lists.append(api_response)
-                supported_fields.append(field)
+        for field, api_response in fetch_fields(api_obj, fields):
+            lists.append(api_response)
+            supported_fields.append(field)
         for i, j in enumerate(api_obj.get_list()):
             temp = {}
             temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
             result_dict[j] = temp
     return result_dict
 
-def generate_simple_dict(api_obj, fields):
+def generate_simple_dict(api_obj, fields, projection=None):
+    fields = project_fields(fields, projection)
     result_dict = {}
-    for field in fields:
-        try:
-            api_response = getattr(api_obj, "get_" + field)()
-        except (MethodNotFound, WebFault):
-            pass
-        else:
-            result_dict[field] = api_response
+    for field, api_response in fetch_fields(api_obj, fields):
+        result_dict[field] = api_response
     return result_dict
 
-def generate_interface_dict(f5, regex):
+# attributes collected per fact category, the choices of the fields option
+CATEGORY_FIELDS = {
+    'interface': ['active_media', 'actual_flow_control', 'bundle_state',
+                  'description', 'dual_media_state', 'enabled_state', 'if_index',
+                  'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
+                  'mac_address', 'media', 'media_option', 'media_option_sfp',
+                  'media_sfp', 'media_speed', 'media_status', 'mtu',
+                  'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
+                  'sflow_poll_interval', 'sflow_poll_interval_global',
+                  'sfp_media_state', 'stp_active_edge_port_state',
+                  'stp_enabled_state', 'stp_link_type',
+                  'stp_protocol_detection_reset_state'],
+    'self_ip': ['address', 'allow_access_list', 'description',
+                'enforced_firewall_policy', 'floating_state', 'fw_rule',
+                'netmask', 'staged_firewall_policy', 'traffic_group',
+                'vlan', 'is_traffic_group_inherited'],
+    'trunk': ['active_lacp_state', 'configured_member_count', 'description',
+              'distribution_hash_option', 'interface', 'lacp_enabled_state',
+              'lacp_timeout_option', 'link_selection_policy', 'media_speed',
+              'media_status', 'operational_member_count', 'stp_enabled_state',
+              'stp_protocol_detection_reset_state'],
+    'vlan': ['auto_lasthop', 'cmp_hash_algorithm', 'description',
+             'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
+             'failsafe_timeout', 'if_index', 'learning_mode',
+             'mac_masquerade_address', 'member', 'mtu',
+             'sflow_poll_interval', 'sflow_poll_interval_global',
+             'sflow_sampling_rate', 'sflow_sampling_rate_global',
+             'source_check_state', 'true_mac_address', 'vlan_id'],
+    'virtual_server': ['actual_hardware_acceleration', 'authentication_profile',
+                       'auto_lasthop', 'bw_controller_policy', 'clone_pool',
+                       'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
+                       'default_pool_name', 'description', 'destination',
+                       'enabled_state', 'enforced_firewall_policy',
+                       'fallback_persistence_profile', 'fw_rule', 'gtm_score',
+                       'last_hop_pool', 'nat64_state', 'object_status',
+                       'persistence_profile', 'profile', 'protocol',
+                       'rate_class', 'rate_limit', 'rate_limit_destination_mask',
+                       'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
+                       'rule', 'security_log_profile', 'snat_pool', 'snat_type',
+                       'source_address', 'source_address_translation_lsn_pool',
+                       'source_address_translation_snat_pool',
+                       'source_address_translation_type', 'source_port_behavior',
+                       'staged_firewall_policy', 'translate_address_state',
+                       'translate_port_state', 'type', 'vlan', 'wildmask'],
+    'pool': ['action_on_service_down', 'active_member_count',
+             'aggregate_dynamic_ratio', 'allow_nat_state',
+             'allow_snat_state', 'client_ip_tos', 'client_link_qos',
+             'description', 'gateway_failsafe_device',
+             'ignore_persisted_weight_state', 'lb_method', 'member',
+             'minimum_active_member', 'minimum_up_member',
+             'minimum_up_member_action', 'minimum_up_member_enabled_state',
+             'monitor_association', 'monitor_instance', 'object_status',
+             'profile', 'queue_depth_limit',
+             'queue_on_connection_limit_state', 'queue_time_limit',
+             'reselect_tries', 'server_ip_tos', 'server_link_qos',
+             'simple_timeout', 'slow_ramp_time'],
+    'device': ['active_modules', 'base_mac_address', 'blade_addresses',
+               'build', 'chassis_id', 'chassis_type', 'comment',
+               'configsync_address', 'contact', 'description', 'edition',
+               'failover_state', 'hostname', 'inactive_modules', 'location',
+               'management_address', 'marketing_name', 'multicast_address',
+               'optional_modules', 'platform_id', 'primary_mirror_address',
+               'product', 'secondary_mirror_address', 'software_version',
+               'timelimited_modules', 'timezone', 'unicast_addresses'],
+    'device_group': ['all_preferred_active', 'autosync_enabled_state','description',
+                     'device', 'full_load_on_sync_state',
+                     'incremental_config_sync_size_maximum',
+                     'network_failover_enabled_state', 'sync_status', 'type'],
+    'traffic_group': ['auto_failback_enabled_state', 'auto_failback_time',
+                      'default_device', 'description', 'ha_load_factor',
+                      'ha_order', 'is_floating', 'mac_masquerade_address',
+                      'unit_id'],
+    'rule': ['definition', 'description', 'ignore_vertification',
+             'verification_status'],
+    'node': ['address', 'connection_limit', 'description', 'dynamic_ratio',
+             'monitor_instance', 'monitor_rule', 'monitor_status',
+             'object_status', 'rate_limit', 'ratio', 'session_status'],
+    'virtual_address': ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
+                        'description', 'enabled_state', 'icmp_echo_state',
+                        'is_floating_state', 'netmask', 'object_status',
+                        'route_advertisement_state', 'traffic_group'],
+    'address_class': ['address_class', 'description'],
+    'client_ssl_profile': ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
+                           'authenticate_once_state', 'ca_file', 'cache_size',
+                           'cache_timeout', 'certificate_file', 'chain_file',
+                           'cipher_list', 'client_certificate_ca_file', 'crl_file',
+                           'default_profile', 'description',
+                           'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
+                           'forward_proxy_ca_passphrase',
+                           'forward_proxy_certificate_extension_include',
+                           'forward_proxy_certificate_lifespan',
+                           'forward_proxy_enabled_state',
+                           'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
+                           'key_file', 'modssl_emulation_state', 'passphrase',
+                           'peer_certification_mode', 'profile_mode',
+                           'renegotiation_maximum_record_delay', 'renegotiation_period',
+                           'renegotiation_state', 'renegotiation_throughput',
+                           'retain_certificate_state', 'secure_renegotiation_mode',
+                           'server_name', 'session_ticket_state', 'sni_default_state',
+                           'sni_require_state', 'ssl_option', 'strict_resume_state',
+                           'unclean_shutdown_state', 'is_base_profile', 'is_system_profile'],
+    'system_info': ['base_mac_address',
+                    'blade_temperature', 'chassis_slot_information',
+                    'globally_unique_identifier', 'group_id',
+                    'hardware_information',
+                    'marketing_name',
+                    'product_information', 'pva_version', 'system_id',
+                    'system_information', 'time',
+                    'time_zone', 'uptime'],
+}
+
+def generate_interface_dict(f5, regex, snapshot=None, projection=None):
     interfaces = Interfaces(f5.get_api(), regex)
-    fields = ['active_media', 'actual_flow_control', 'bundle_state',
-              'description', 'dual_media_state', 'enabled_state', 'if_index',
-              'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
-              'mac_address', 'media', 'media_option', 'media_option_sfp',
-              'media_sfp', 'media_speed', 'media_status', 'mtu',
-              'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sfp_media_state', 'stp_active_edge_port_state',
-              'stp_enabled_state', 'stp_link_type',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
-
-def generate_self_ip_dict(f5, regex):
+    fields = CATEGORY_FIELDS['interface']
+    return generate_dict(interfaces, fields, snapshot, projection)
+
+def generate_self_ip_dict(f5, regex, snapshot=None, projection=None):
     self_ips = SelfIPs(f5.get_api(), regex)
-    fields = ['address', 'allow_access_list', 'description',
-              'enforced_firewall_policy', 'floating_state', 'fw_rule',
-              'netmask', 'staged_firewall_policy', 'traffic_group',
-              'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    fields = CATEGORY_FIELDS['self_ip']
+    return generate_dict(self_ips, fields, snapshot, projection)
 
-def generate_trunk_dict(f5, regex):
+def generate_trunk_dict(f5, regex, snapshot=None, projection=None):
     trunks = Trunks(f5.get_api(), regex)
-    fields = ['active_lacp_state', 'configured_member_count', 'description',
-              'distribution_hash_option', 'interface', 'lacp_enabled_state',
-              'lacp_timeout_option', 'link_selection_policy', 'media_speed',
-              'media_status', 'operational_member_count', 'stp_enabled_state',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
+    fields = CATEGORY_FIELDS['trunk']
+    return generate_dict(trunks, fields, snapshot, projection)
 
-def generate_vlan_dict(f5, regex):
+def generate_vlan_dict(f5, regex, snapshot=None, projection=None):
     vlans = Vlans(f5.get_api(), regex)
-    fields = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
-              'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
-              'failsafe_timeout', 'if_index', 'learning_mode',
-              'mac_masquerade_address', 'member', 'mtu',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sflow_sampling_rate', 'sflow_sampling_rate_global',
-              'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
-
-def generate_vs_dict(f5, regex):
+    fields = CATEGORY_FIELDS['vlan']
+    return generate_dict(vlans, fields, snapshot, projection)
+
+def generate_vs_dict(f5, regex, snapshot=None, projection=None):
     virtual_servers = VirtualServers(f5.get_api(), regex)
-    fields = ['actual_hardware_acceleration', 'authentication_profile',
-              'auto_lasthop', 'bw_controller_policy', 'clone_pool',
-              'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
-              'default_pool_name', 'description', 'destination',
-              'enabled_state', 'enforced_firewall_policy',
-              'fallback_persistence_profile', 'fw_rule', 'gtm_score',
-              'last_hop_pool', 'nat64_state', 'object_status',
-              'persistence_profile', 'profile', 'protocol',
-              'rate_class', 'rate_limit', 'rate_limit_destination_mask',
-              'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
-              'rule', 'security_log_profile', 'snat_pool', 'snat_type',
-              'source_address', 'source_address_translation_lsn_pool',
-              'source_address_translation_snat_pool',
-              'source_address_translation_type', 'source_port_behavior',
-              'staged_firewall_policy', 'translate_address_state',
-              'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
-
-def generate_pool_dict(f5, regex):
+    fields = CATEGORY_FIELDS['virtual_server']
+    return generate_dict(virtual_servers, fields, snapshot, projection)
+
+def generate_pool_dict(f5, regex, snapshot=None, projection=None):
     pools = Pools(f5.get_api(), regex)
-    fields = ['action_on_service_down', 'active_member_count',
-              'aggregate_dynamic_ratio', 'allow_nat_state',
-              'allow_snat_state', 'client_ip_tos', 'client_link_qos',
-              'description', 'gateway_failsafe_device',
-              'ignore_persisted_weight_state', 'lb_method', 'member',
-              'minimum_active_member', 'minimum_up_member',
-              'minimum_up_member_action', 'minimum_up_member_enabled_state',
-              'monitor_association', 'monitor_instance', 'object_status',
-              'profile', 'queue_depth_limit',
-              'queue_on_connection_limit_state', 'queue_time_limit',
-              'reselect_tries', 'server_ip_tos', 'server_link_qos',
-              'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
-
-def generate_device_dict(f5, regex):
+    fields = CATEGORY_FIELDS['pool']
+    return generate_dict(pools, fields, snapshot, projection)
+
+def generate_device_dict(f5, regex, snapshot=None, projection=None):
     devices = Devices(f5.get_api(), regex)
-    fields = ['active_modules', 'base_mac_address', 'blade_addresses',
-              'build', 'chassis_id', 'chassis_type', 'comment',
-              'configsync_address', 'contact', 'description', 'edition',
-              'failover_state', 'hostname', 'inactive_modules', 'location',
-              'management_address', 'marketing_name', 'multicast_address',
-              'optional_modules', 'platform_id', 'primary_mirror_address',
-              'product', 'secondary_mirror_address', 'software_version',
-              'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
-
-def generate_device_group_dict(f5, regex):
+    fields = CATEGORY_FIELDS['device']
+    return generate_dict(devices, fields, snapshot, projection)
+
+def generate_device_group_dict(f5, regex, snapshot=None, projection=None):
     device_groups = DeviceGroups(f5.get_api(), regex)
-    fields = ['all_preferred_active', 'autosync_enabled_state','description',
-              'device', 'full_load_on_sync_state',
-              'incremental_config_sync_size_maximum',
-              'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    fields = CATEGORY_FIELDS['device_group']
+    return generate_dict(device_groups, fields, snapshot, projection)
 
-def generate_traffic_group_dict(f5, regex):
+def generate_traffic_group_dict(f5, regex, snapshot=None, projection=None):
     traffic_groups = TrafficGroups(f5.get_api(), regex)
-    fields = ['auto_failback_enabled_state', 'auto_failback_time',
-              'default_device', 'description', 'ha_load_factor',
-              'ha_order', 'is_floating', 'mac_masquerade_address',
-              'unit_id']
-    return generate_dict(traffic_groups, fields)
+    fields = CATEGORY_FIELDS['traffic_group']
+    return generate_dict(traffic_groups, fields, snapshot, projection)
 
-def generate_rule_dict(f5, regex):
+def generate_rule_dict(f5, regex, snapshot=None, projection=None):
     rules = Rules(f5.get_api(), regex)
-    fields = ['definition', 'description', 'ignore_vertification',
-              'verification_status']
-    return generate_dict(rules, fields)
+    fields = CATEGORY_FIELDS['rule']
+    return generate_dict(rules, fields, snapshot, projection)
 
-def generate_node_dict(f5, regex):
+def generate_node_dict(f5, regex, snapshot=None, projection=None):
     nodes = Nodes(f5.get_api(), regex)
-    fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
-              'monitor_instance', 'monitor_rule', 'monitor_status',
-              'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    fields = CATEGORY_FIELDS['node']
+    return generate_dict(nodes, fields, snapshot, projection)
 
-def generate_virtual_address_dict(f5, regex):
+def generate_virtual_address_dict(f5, regex, snapshot=None, projection=None):
     virtual_addresses = VirtualAddresses(f5.get_api(), regex)
-    fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
-              'description', 'enabled_state', 'icmp_echo_state',
-              'is_floating_state', 'netmask', 'object_status',
-              'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    fields = CATEGORY_FIELDS['virtual_address']
+    return generate_dict(virtual_addresses, fields, snapshot, projection)
 
-def generate_address_class_dict(f5, regex):
+def generate_address_class_dict(f5, regex, snapshot=None, projection=None):
     address_classes = AddressClasses(f5.get_api(), regex)
-    fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    fields = CATEGORY_FIELDS['address_class']
+    return generate_dict(address_classes, fields, snapshot, projection)
 
 def generate_certificate_dict(f5, regex):
     certificates = Certificates(f5.get_api(), regex)
@@ -1534,46 +1858,59 @@ def generate_key_dict(f5, regex):
     keys = Keys(f5.get_api(), regex)
     return dict(zip(keys.get_list(), keys.get_key_list()))
 
-def generate_client_ssl_profile_dict(f5, regex):
+def generate_client_ssl_profile_dict(f5, regex, snapshot=None, projection=None):
     profiles = ProfileClientSSL(f5.get_api(), regex)
-    fields = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
-              'authenticate_once_state', 'ca_file', 'cache_size',
-              'cache_timeout', 'certificate_file', 'chain_file',
-              'cipher_list', 'client_certificate_ca_file', 'crl_file',
-              'default_profile', 'description',
-              'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
-              'forward_proxy_ca_passphrase',
-              'forward_proxy_certificate_extension_include',
-              'forward_proxy_certificate_lifespan',
-              'forward_proxy_enabled_state',
-              'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
-              'key_file', 'modssl_emulation_state', 'passphrase',
-              'peer_certification_mode', 'profile_mode',
-              'renegotiation_maximum_record_delay', 'renegotiation_period',
-              'renegotiation_state', 'renegotiation_throughput',
-              'retain_certificate_state', 'secure_renegotiation_mode',
-              'server_name', 'session_ticket_state', 'sni_default_state',
-              'sni_require_state', 'ssl_option', 'strict_resume_state',
-              'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
-
-def generate_system_info_dict(f5):
+    fields = CATEGORY_FIELDS['client_ssl_profile']
+    return generate_dict(profiles, fields, snapshot, projection)
+
+def generate_system_info_dict(f5, projection=None):
     system_info = SystemInfo(f5.get_api())
-    fields = ['base_mac_address',
-              'blade_temperature', 'chassis_slot_information',
-              'globally_unique_identifier', 'group_id',
-              'hardware_information',
-              'marketing_name',
-              'product_information', 'pva_version', 'system_id',
-              'system_information', 'time',
-              'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    fields = CATEGORY_FIELDS['system_info']
+    return generate_simple_dict(system_info, fields, projection)
 
 def generate_software_list(f5):
     software = Software(f5.get_api())
     software_list = software.get_all_software_status()
     return software_list
 
+# fact categories in collection order, mapped to their generator functions;
+# software and system_info are not filterable
+FACT_CATEGORIES = ('interface', 'self_ip', 'trunk', 'vlan', 'virtual_server',
+                   'pool', 'device', 'device_group', 'traffic_group', 'rule',
+                   'node', 'virtual_address', 'address_class', 'software',
+                   'certificate', 'key', 'client_ssl_profile', 'system_info')
+
+# snapshot lifetime in seconds of categories that rarely change
+DEFAULT_CACHE_TTL = {'certificate': 3600, 'device': 3600, 'device_group': 3600,
+                     'key': 3600, 'software': 3600, 'system_info': 3600}
+
+def collect_category(f5, category, regex, snapshot=None, projection=None):
+    if category == 'software':
+        return generate_software_list(f5)
+    if category == 'system_info':
+        return generate_system_info_dict(f5, projection)
+    if category == 'certificate':
+        return generate_certificate_dict(f5, regex)
+    if category == 'key':
+        return generate_key_dict(f5, regex)
+    generators = {
+        'interface': generate_interface_dict,
+        'self_ip': generate_self_ip_dict,
+        'trunk': generate_trunk_dict,
+        'vlan': generate_vlan_dict,
+        'virtual_server': generate_vs_dict,
+        'pool': generate_pool_dict,
+        'device': generate_device_dict,
+        'device_group': generate_device_group_dict,
+        'traffic_group': generate_traffic_group_dict,
+        'rule': generate_rule_dict,
+        'node': generate_node_dict,
+        'virtual_address': generate_virtual_address_dict,
+        'address_class': generate_address_class_dict,
+        'client_ssl_profile': generate_client_ssl_profile_dict,
+    }
+    return generators[category](f5, regex, snapshot, projection)
+
 def disable_ssl_cert_validation():
     # You probably only want to do this for testing and never in production.
     # From https://www.python.org/dev/peps/pep-0476/#id29
@@ -1591,6 +1928,11 @@ def main():
             session = dict(type='bool', default=False),
             include = dict(type='list', required=True),
             filter = dict(type='str', required=False),
+            workers = dict(type='int', default=1),
+            cache_path = dict(type='str', required=False),
+            cache_ttl = dict(type='dict', required=False),
+            cache_refresh = dict(default='full', choices=['full', 'changed']),
+            fields = dict(type='dict', required=False),
         )
     )
 
@@ -1602,7 +1944,13 @@ def main():
     password = module.params['password']
     validate_certs = module.params['validate_certs']
     session = module.params['session']
+    workers = module.params['workers']
+    cache_path = module.params['cache_path']
+    cache_refresh = module.params['cache_refresh']
+    cache_ttl = dict(DEFAULT_CACHE_TTL)
+    cache_ttl.update(module.params['cache_ttl'] or {})
     fact_filter = module.params['filter']
+    fields = module.params['fields'] or {}
     if fact_filter:
         regex = fnmatch.translate(fact_filter)
     else:
@@ -1616,14 +1964,51 @@ def main():
     include_test = map(lambda x: x in valid_includes, include)
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
+    if workers < 1:
+        module.fail_json(msg="workers must be a positive integer")
+    for category, category_fields in fields.items():
+        if category not in valid_includes or category in ('certificate', 'key', 'software'):
+            module.fail_json(msg="fields keys must be fact categories with attributes, got: %s" % category)
+        if isinstance(category_fields, basestring):
+            category_fields = category_fields.split(',')
+        fields[category] = [field.strip().lower() for field in category_fields]
+        unknown = [field for field in fields[category] if field not in CATEGORY_FIELDS[category]]
+        if unknown:
+            module.fail_json(msg="unknown %s field(s) %s, expected one or more of: %s"
+                                 % (category, ",".join(unknown), ",".join(CATEGORY_FIELDS[category])))
+    try:
+        cache_ttl = dict([(k, int(v)) for k, v in cache_ttl.items()])
+    except ValueError:
+        module.fail_json(msg="cache_ttl values must be integers (seconds)")
 
     if not validate_certs:
         disable_ssl_cert_validation()
 
     try:
         facts = {}
-
-        if len(include) > 0:
+        categories = [category for category in FACT_CATEGORIES
+                      if category in include]
+        snapshots = {}
+
+        if cache_path:
+            cache = FactCache(cache_path, server, fact_filter, fields)
+            for category in list(categories):
+                if cache.is_fresh(category, cache_ttl.get(category, 0)):
+                    facts[category] = cache.get_facts(category)
+                    categories.remove(category)
+                elif cache_refresh == 'changed':
+                    snapshots[category] = cache.get_facts(category)
+
+        if len(categories) > 0 and workers > 1:
+            # session-scoped clients: folder and recursive query state are
+            # set per session and never touch the user's saved state
+            f5 = F5Pool(server, user, password, workers)
+            results = f5.map(lambda category: collect_category(f5, category, regex,
+                                                               snapshots.get(category),
+                                                               fields.get(category)),
+                             categories)
+            facts.update(zip(categories, results))
+        elif len(categories) > 0:
             f5 = F5(server, user, password, session)
             saved_active_folder = f5.get_active_folder()
             saved_recursive_query_state = f5.get_recursive_query_state()
@@ -1632,42 +2017,10 @@ def main():
             if saved_recursive_query_state != "STATE_ENABLED":
                 f5.enable_recursive_query_state()
 
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
+            for category in categories:
+                facts[category] = collect_category(f5, category, regex,
+                                                   snapshots.get(category),
+                                                   fields.get(category))
 
             # restore saved state
             if saved_active_folder and saved_active_folder != "/":
@@ -1676,6 +2029,11 @@ def main():
                saved_recursive_query_state != "STATE_ENABLED":
                 f5.set_recursive_query_state(saved_recursive_query_state)
 
+        if cache_path and len(categories) > 0:
+            for category in categories:
+                cache.update(category, facts[category])
+            cache.save()
+
         result = {'ansible_facts': facts}
 
     except Exception, e:
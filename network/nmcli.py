@@ -45,6 +45,7 @@ options:
         required: True
         description:
             - 'Where conn_name will be the name used to call the connection. when not provided a default name is generated: <type>[-<ifname>][-<num>]'
+            - Not used with I(connections).
     ifname:
         required: False
         default: conn_name
@@ -208,6 +209,17 @@ options:
         default: None
         description:
             - This is only used with VLAN - VLAN egress priority mapping
+    connections:
+        required: False
+        default: None
+        version_added: "2.1"
+        description:
+            - A list of connection definitions to apply in one run, e.g. a bond, its slaves and the VLANs on top of it.
+              Each definition is a dict of the options above and must set C(conn_name). Options given outside the list,
+              including I(state), are used as defaults for every definition.
+            - The existing connections are enumerated once and only definitions that differ from them are applied.
+              Masters and VLAN parents are created before the connections that refer to them and removed after them.
+              Only created or modified connections are brought up.
 
 '''
 
@@ -362,6 +374,15 @@ tenant_ip: "192.168.200.21/23"
 # To change the property of a setting e.g. MTU, issue a command as follows:
 - nmcli: conn_name=my-eth1 mtu=9000 state=present
 
+# To build a bond with two slaves and a VLAN on top of it in one run:
+- nmcli:
+    state: present
+    connections:
+      - {conn_name: bond0, type: bond, ifname: bond0, mode: 802.3ad}
+      - {conn_name: bond0-em1, type: bond-slave, ifname: em1, master: bond0}
+      - {conn_name: bond0-em2, type: bond-slave, ifname: em2, master: bond0}
+      - {conn_name: vlan100, type: vlan, ifname: bond0.100, vlandev: bond0, vlanid: 100, ip4: 192.168.100.10/24}
+
     Exit Status's:
         - nmcli exits with status 0 if it succeeds, a value greater than 0 is
         returned if an error occurs.
@@ -379,6 +400,9 @@ tenant_ip: "192.168.200.21/23"
 '''
 # import ansible.module_utils.basic
 import os
+import re
+import socket
+import struct
 import syslog
 import sys
 import dbus
@@ -432,40 +456,46 @@ class Nmcli(object):
             }
 
 
-    def __init__(self, module):
+    def __init__(self, module, params=None):
+        # params defaults to the module parameters; the connections option
+        # hands in the parameters of each connection definition instead
+        if params is None:
+            params=module.params
         self.module=module
-        self.state=module.params['state']
-        self.autoconnect=module.params['autoconnect']
-        self.conn_name=module.params['conn_name']
-        self.master=module.params['master']
-        self.ifname=module.params['ifname']
-        self.type=module.params['type']
-        self.ip4=module.params['ip4']
-        self.gw4=module.params['gw4']
-        self.dns4=module.params['dns4']
-        self.ip6=module.params['ip6']
-        self.gw6=module.params['gw6']
-        self.dns6=module.params['dns6']
-        self.mtu=module.params['mtu']
-        self.stp=module.params['stp']
-        self.priority=module.params['priority']
-        self.mode=module.params['mode']
-        self.miimon=module.params['miimon']
-        self.downdelay=module.params['downdelay']
-        self.updelay=module.params['updelay']
-        self.arp_interval=module.params['arp_interval']
-        self.arp_ip_target=module.params['arp_ip_target']
-        self.slavepriority=module.params['slavepriority']
-        self.forwarddelay=module.params['forwarddelay']
-        self.hellotime=module.params['hellotime']
-        self.maxage=module.params['maxage']
-        self.ageingtime=module.params['ageingtime']
-        self.mac=module.params['mac']
-        self.vlanid=module.params['vlanid']
-        self.vlandev=module.params['vlandev']
-        self.flags=module.params['flags']
-        self.ingress=module.params['ingress']
-        self.egress=module.params['egress']
+        self.state=params['state']
+        self.autoconnect=params['autoconnect']
+        self.conn_name=params['conn_name']
+        self.master=params['master']
+        self.ifname=params['ifname']
+        self.type=params['type']
+        self.ip4=params['ip4']
+        self.gw4=params['gw4']
+        self.dns4=params['dns4']
+        self.ip6=params['ip6']
+        self.gw6=params['gw6']
+        self.dns6=params['dns6']
+        self.mtu=params['mtu']
+        self.stp=params['stp']
+        self.priority=params['priority']
+        self.mode=params['mode']
+        self.miimon=params['miimon']
+        self.downdelay=params['downdelay']
+        self.updelay=params['updelay']
+        self.arp_interval=params['arp_interval']
+        self.arp_ip_target=params['arp_ip_target']
+        self.slavepriority=params['slavepriority']
+        self.forwarddelay=params['forwarddelay']
+        self.hellotime=params['hellotime']
+        self.maxage=params['maxage']
+        self.ageingtime=params['ageingtime']
+        self.mac=params['mac']
+        self.vlanid=params['vlanid']
+        self.vlandev=params['vlandev']
+        self.flags=params['flags']
+        self.ingress=params['ingress']
+        self.egress=params['egress']
+        # name/uuid index of the existing connections, see connection_index()
+        self._connection_index=None
         # select whether we dump additional debug info through syslog
         self.syslogging=True
 
@@ -554,13 +584,178 @@ class Nmcli(object):
             connection_list.append(self.connection_to_string(config))
         return connection_list
 
-    def connection_exists(self):
-        # we are going to use name and type in this instance to find if that connection exists and is of type x
-        connections=self.list_connection_info()
+    def connection_index(self):
+        # Index the existing connections by name and uuid. Only GetSettings
+        # is called per connection; secrets are fetched on demand by
+        # connection_secrets(). The index is kept for the rest of the run.
+        if self._connection_index is not None:
+            return self._connection_index
+
+        service_name="org.freedesktop.NetworkManager"
+        proxy=self.bus.get_object(service_name, "/org/freedesktop/NetworkManager/Settings")
+        settings=dbus.Interface(proxy, "org.freedesktop.NetworkManager.Settings")
+        index={}
+        for path in settings.ListConnections():
+            con_proxy=self.bus.get_object(service_name, path)
+            settings_connection=dbus.Interface(con_proxy, "org.freedesktop.NetworkManager.Settings.Connection")
+            config=settings_connection.GetSettings()
+            s_con=config['connection']
+            entry=dict(
+                path=path,
+                id=str(s_con['id']),
+                uuid=str(s_con['uuid']),
+                type=str(s_con['type']),
+                config=config,
+                interface=settings_connection,
+                secrets=False,
+            )
+            index[entry['id']]=entry
+            index[entry['uuid']]=entry
+        self._connection_index=index
+        return index
+
+    def invalidate_connection_index(self):
+        # connections were added, changed or removed behind our back
+        self._connection_index=None
+
+    def get_connection(self, name=None):
+        # the indexed connection named (or with the uuid) name, or None
+        if name is None:
+            name=self.conn_name
+        return self.connection_index().get(name)
+
+    def connection_secrets(self, entry):
+        # merge the secrets of a single indexed connection into its config
+        if not entry['secrets']:
+            for setting_name in ('802-11-wireless', '802-11-wireless-security', '802-1x', 'gsm', 'cdma', 'ppp'):
+                self.merge_secrets(entry['interface'], entry['config'], setting_name)
+            entry['secrets']=True
+        return entry['config']
 
-        for con_item in connections:
-            if self.conn_name==con_item:
+    def connection_exists(self):
+        # we are going to use name and uuid in this instance to find if that connection exists
+        return self.get_connection() is not None
+
+    # module options compared against an existing profile, per type. Options
+    # of other types (and bridge options, which this module doesn't apply)
+    # are left out so that their defaults don't show up as a difference.
+    DIFF_KEYS=['ifname', 'master', 'autoconnect', 'ip4', 'gw4', 'dns4', 'ip6', 'gw6', 'dns6', 'mtu', 'mac']
+    DIFF_TYPE_KEYS={'bond': ['mode', 'miimon', 'downdelay', 'updelay', 'arp_interval', 'arp_ip_target'],
+                    'vlan': ['vlanid', 'vlandev', 'flags', 'ingress', 'egress']}
+    NM_TYPES={'802-3-ethernet': 'ethernet', 'bond': 'bond', 'team': 'team', 'bridge': 'bridge', 'vlan': 'vlan'}
+
+    def _ip4_address(self, addr):
+        # ipv4 addresses come as uint32 in network byte order
+        return socket.inet_ntoa(struct.pack('=I', int(addr)))
+
+    def _ip6_address(self, addr):
+        # ipv6 addresses come as arrays of 16 bytes
+        return socket.inet_ntop(socket.AF_INET6, ''.join([chr(int(b)) for b in addr]))
+
+    def _normalize_ip6(self, value, prefix=None):
+        # the canonical form of an ipv6 address, with the prefix nmcli
+        # defaults to when one is wanted but not given
+        parts=str(value).split('/', 1)
+        try:
+            address=socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, parts[0]))
+        except (socket.error, ValueError):
+            address=parts[0]
+        if len(parts)==2:
+            return '%s/%s' % (address, parts[1])
+        if prefix is not None:
+            return '%s/%s' % (address, prefix)
+        return address
+
+    def _split_list(self, value):
+        if isinstance(value, list):
+            value=' '.join(map(str, value))
+        return sorted(v for v in re.split(r'[\s,\[\]"\']+', str(value)) if v)
+
+    def current_settings(self, entry):
+        # the module options as they are set on an indexed connection;
+        # options that can't be read back are not returned
+        config=entry['config']
+        s_con=config.get('connection', {})
+        current={}
+        nm_type=self.NM_TYPES.get(str(s_con.get('type')), str(s_con.get('type')))
+        if nm_type=='ethernet' and s_con.get('slave-type') in ('bond', 'team'):
+            nm_type='%s-slave' % s_con.get('slave-type')
+        current['type']=nm_type
+        current['ifname']=s_con.get('interface-name')
+        current['master']=s_con.get('master')
+        current['autoconnect']=s_con.get('autoconnect', True) and 'yes' or 'no'
+
+        s_ip4=config.get('ipv4', {})
+        if s_ip4.get('address-data'):
+            current['ip4']=['%s/%s' % (a['address'], a['prefix']) for a in s_ip4['address-data']]
+        elif s_ip4.get('addresses'):
+            current['ip4']=['%s/%s' % (self._ip4_address(a[0]), a[1]) for a in s_ip4['addresses']]
+        if s_ip4.get('gateway'):
+            current['gw4']=s_ip4['gateway']
+        elif s_ip4.get('addresses') and s_ip4['addresses'][0][2]:
+            current['gw4']=self._ip4_address(s_ip4['addresses'][0][2])
+        current['dns4']=[self._ip4_address(a) for a in s_ip4.get('dns', [])]
+
+        s_ip6=config.get('ipv6', {})
+        if s_ip6.get('address-data'):
+            current['ip6']=['%s/%s' % (a['address'], a['prefix']) for a in s_ip6['address-data']]
+        elif s_ip6.get('addresses'):
+            current['ip6']=['%s/%s' % (self._ip6_address(a[0]), a[1]) for a in s_ip6['addresses']]
+        if s_ip6.get('gateway'):
+            current['gw6']=s_ip6['gateway']
+        elif s_ip6.get('addresses') and [b for b in s_ip6['addresses'][0][2] if int(b)]:
+            current['gw6']=self._ip6_address(s_ip6['addresses'][0][2])
+        current['dns6']=[self._ip6_address(a) for a in s_ip6.get('dns', [])]
+
+        s_eth=config.get('802-3-ethernet', {})
+        if 'mtu' in s_eth:
+            current['mtu']=s_eth['mtu']
+        if 'mac-address' in s_eth:
+            current['mac']=':'.join('%02X' % int(b) for b in s_eth['mac-address'])
+
+        for key, value in config.get('bond', {}).get('options', {}).items():
+            current[str(key).replace('-', '_')]=value
+
+        s_vlan=config.get('vlan', {})
+        if 'id' in s_vlan:
+            current['vlanid']=s_vlan['id']
+        if 'parent' in s_vlan:
+            current['vlandev']=s_vlan['parent']
+        if 'flags' in s_vlan:
+            current['flags']=s_vlan['flags']
+        current['ingress']=s_vlan.get('ingress-priority-map', [])
+        current['egress']=s_vlan.get('egress-priority-map', [])
+        return current
+
+    def _same(self, key, current, desired):
+        if current is None:
+            return False
+        if key in ('ip4', 'dns4', 'arp_ip_target', 'ingress', 'egress'):
+            return self._split_list(current)==self._split_list(desired)
+        if key=='ip6':
+            return sorted([self._normalize_ip6(v, 128) for v in self._split_list(current)])==sorted([self._normalize_ip6(v, 128) for v in self._split_list(desired)])
+        if key=='dns6':
+            return sorted([self._normalize_ip6(v) for v in self._split_list(current)])==sorted([self._normalize_ip6(v) for v in self._split_list(desired)])
+        if key=='gw6':
+            return self._normalize_ip6(current)==self._normalize_ip6(desired)
+        if key=='mac':
+            return str(current).upper()==str(desired).upper()
+        if key in ('master', 'vlandev'):
+            # may be stored as a connection name, uuid or interface name
+            entry=self.get_connection(desired)
+            return str(current) in [str(desired)] + (entry and [entry['id'], entry['uuid']] or [])
+        return str(current)==str(desired)
+
+    def connection_differs(self, entry):
+        # compare this definition against an indexed connection
+        current=self.current_settings(entry)
+        if self.type is not None and current['type']!=self.type:
+            return True
+        for key in self.DIFF_KEYS + self.DIFF_TYPE_KEYS.get(self.type, []):
+            desired=getattr(self, key)
+            if desired is not None and not self._same(key, current.get(key), desired):
                 return True
+        return False
 
     def down_connection(self):
         cmd=[self.module.get_bin_path('nmcli', True)]
@@ -876,12 +1071,98 @@ class Nmcli(object):
 
     def create_connection_vlan(self):
         cmd=[self.module.get_bin_path('nmcli', True)]
-        # format for creating ethernet interface
+        # format for creating vlan interface
+        cmd.append('con')
+        cmd.append('add')
+        cmd.append('type')
+        cmd.append('vlan')
+        cmd.append('con-name')
+        if self.conn_name is not None:
+            cmd.append(self.conn_name)
+        elif self.ifname is not None:
+            cmd.append(self.ifname)
+        cmd.append('ifname')
+        if self.ifname is not None:
+            cmd.append(self.ifname)
+        elif self.conn_name is not None:
+            cmd.append(self.conn_name)
+        if self.vlandev is not None:
+            cmd.append('dev')
+            cmd.append(self.vlandev)
+        if self.vlanid is not None:
+            cmd.append('id')
+            cmd.append(self.vlanid)
+        if self.flags is not None:
+            cmd.append('flags')
+            cmd.append(self.flags)
+        if self.ingress is not None:
+            cmd.append('ingress')
+            cmd.append(self.ingress)
+        if self.egress is not None:
+            cmd.append('egress')
+            cmd.append(self.egress)
+        if self.ip4 is not None:
+            cmd.append('ip4')
+            cmd.append(self.ip4)
+        if self.gw4 is not None:
+            cmd.append('gw4')
+            cmd.append(self.gw4)
+        if self.ip6 is not None:
+            cmd.append('ip6')
+            cmd.append(self.ip6)
+        if self.gw6 is not None:
+            cmd.append('gw6')
+            cmd.append(self.gw6)
+        if self.autoconnect is not None:
+            cmd.append('autoconnect')
+            cmd.append(self.autoconnect)
         return cmd
 
     def modify_connection_vlan(self):
         cmd=[self.module.get_bin_path('nmcli', True)]
-        # format for modifying ethernet interface
+        # format for modifying vlan interface
+        cmd.append('con')
+        cmd.append('mod')
+        cmd.append(self.conn_name)
+        if self.vlandev is not None:
+            cmd.append('vlan.parent')
+            cmd.append(self.vlandev)
+        if self.vlanid is not None:
+            cmd.append('vlan.id')
+            cmd.append(self.vlanid)
+        if self.flags is not None:
+            cmd.append('vlan.flags')
+            cmd.append(self.flags)
+        if self.ingress is not None:
+            cmd.append('vlan.ingress-priority-map')
+            cmd.append(self.ingress)
+        if self.egress is not None:
+            cmd.append('vlan.egress-priority-map')
+            cmd.append(self.egress)
+        if self.ip4 is not None:
+            cmd.append('ipv4.address')
+            cmd.append(self.ip4)
+        if self.gw4 is not None:
+            cmd.append('ipv4.gateway')
+            cmd.append(self.gw4)
+        if self.dns4 is not None:
+            cmd.append('ipv4.dns')
+            cmd.append(self.dns4)
+        if self.ip6 is not None:
+            cmd.append('ipv6.address')
+            cmd.append(self.ip6)
+        if self.gw6 is not None:
+            cmd.append('ipv6.gateway')
+            cmd.append(self.gw6)
+        if self.dns6 is not None:
+            cmd.append('ipv6.dns')
+            cmd.append(self.dns6)
+        if self.mtu is not None:
+            cmd.append('802-3-ethernet.mtu')
+            cmd.append(self.mtu)
+        if self.autoconnect is not None:
+            cmd.append('autoconnect')
+            cmd.append(self.autoconnect)
         return cmd
 
     def create_connection(self):
@@ -966,13 +1247,117 @@ class Nmcli(object):
         return self.execute_command(cmd)
 
 
+def connection_params(module, definition):
+    # the parameters of one entry of the connections option; the module
+    # level options (except conn_name) serve as defaults
+    params=dict(module.params)
+    del params['connections']
+    params['conn_name']=None
+    for key, value in definition.items():
+        if key not in params:
+            module.fail_json(msg="Unsupported option %s in connection definition" % key)
+        if isinstance(value, bool):
+            value=value and 'yes' or 'no'
+        elif value is not None:
+            value=str(value)
+        params[key]=value
+    if params['conn_name'] is None:
+        module.fail_json(msg="You haven't specified a name for every connection")
+    if params['type']=='team-slave' and (params['master'] is None or params['ifname'] is None):
+        module.fail_json(msg="Connection %s is a team-slave without a master or ifname" % params['conn_name'])
+    return params
+
+
+def order_connections(module, definitions):
+    # order connection definitions so that masters and vlan parents come
+    # before the connections referring to them
+    by_name={}
+    for params in definitions:
+        if params['ifname'] is not None:
+            by_name.setdefault(params['ifname'], params)
+    for params in definitions:
+        by_name[params['conn_name']]=params
+
+    ordered=[]
+    done=set()
+    visiting=set()
+
+    def visit(params):
+        name=params['conn_name']
+        if name in done:
+            return
+        if name in visiting:
+            module.fail_json(msg="Connection %s depends on itself" % name)
+        visiting.add(name)
+        for dep in (params['master'], params['vlandev']):
+            if dep in by_name and by_name[dep] is not params:
+                visit(by_name[dep])
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(params)
+
+    for params in definitions:
+        visit(params)
+    return ordered
+
+
+def apply_connections(module):
+    # diff every definition of the connections option against a single
+    # enumeration of the existing connections, then apply the changes in
+    # dependency order and bring up only the connections that changed
+    index=Nmcli(module).connection_index()
+    definitions=[connection_params(module, d) for d in module.params['connections']]
+
+    pending=[]
+    for params in order_connections(module, definitions):
+        nmcli=Nmcli(module, params)
+        nmcli._connection_index=index
+        entry=nmcli.get_connection()
+        if nmcli.state=='absent':
+            if entry is not None:
+                pending.append(('removed', nmcli))
+        elif entry is None:
+            pending.append(('created', nmcli))
+        elif nmcli.connection_differs(entry):
+            pending.append(('modified', nmcli))
+
+    result=dict(changed=bool(pending),
+                connections=[dict(conn_name=nmcli.conn_name, action=action) for action, nmcli in pending])
+    if module.check_mode or not pending:
+        module.exit_json(**result)
+
+    # slaves and vlans go before the connections they depend on
+    for action, nmcli in reversed(pending):
+        if action=='removed':
+            nmcli.down_connection()
+            (rc, out, err)=nmcli.remove_connection()
+            if rc!=0:
+                module.fail_json(name=nmcli.conn_name, msg=err, rc=rc)
+    for action, nmcli in pending:
+        if action=='created':
+            (rc, out, err)=nmcli.create_connection()
+        elif action=='modified':
+            (rc, out, err)=nmcli.modify_connection()
+        else:
+            continue
+        if rc is not None and rc!=0:
+            module.fail_json(name=nmcli.conn_name, msg=err, rc=rc)
+    for action, nmcli in pending:
+        if action!='removed' and nmcli.autoconnect!='no':
+            (rc, out, err)=nmcli.up_connection()
+            if rc!=0:
+                module.fail_json(name=nmcli.conn_name, msg=err, rc=rc)
+
+    module.exit_json(**result)
+
+
 def main():
     # Parsing argument file
     module=AnsibleModule(
         argument_spec=dict(
             autoconnect=dict(required=False, default=None, choices=['yes', 'no'], type='str'),
             state=dict(required=True, choices=['present', 'absent'], type='str'),
-            conn_name=dict(required=True, type='str'),
+            conn_name=dict(required=False, default=None, type='str'),
             master=dict(required=False, default=None, type='str'),
             ifname=dict(required=False, default=None, type='str'),
             type=dict(required=False, default=None, choices=['ethernet', 'team', 'team-slave', 'bond', 'bond-slave', 'bridge', 'vlan'], type='str'),
@@ -1006,10 +1391,15 @@ def main():
             flags=dict(required=False, default=None, type='str'),
             ingress=dict(required=False, default=None, type='str'),
             egress=dict(required=False, default=None, type='str'),
+            # several connections at once
+            connections=dict(required=False, default=None, type='list'),
         ),
         supports_check_mode=True
     )
 
+    if module.params['connections']:
+        apply_connections(module)
+
     nmcli=Nmcli(module)
 
     rc=None
@@ -1034,6 +1424,7 @@ def main():
                 module.exit_json(changed=True)
             (rc, out, err)=nmcli.down_connection()
             (rc, out, err)=nmcli.remove_connection()
+            nmcli.invalidate_connection_index()
         if rc!=0:
             module.fail_json(name =('No Connection named %s exists' % nmcli.conn_name), msg=err, rc=rc)
 
@@ -1050,6 +1441,7 @@ def main():
             if module.check_mode:
                 module.exit_json(changed=True)
             (rc, out, err)=nmcli.create_connection()
+            nmcli.invalidate_connection_index()
         if rc is not None and rc!=0:
             module.fail_json(name=nmcli.conn_name, msg=err, rc=rc)
 
@@ -22,7 +22,11 @@
 
 import traceback
 import os
+import fnmatch
+import heapq
 import dnf
+import dnf.const
+import dnf.subject
 
 try:
     from dnf import find_unfinished_transactions, find_ts_remaining
@@ -50,6 +54,42 @@ options:
       - Various (non-idempotent) commands for usage with C(/usr/bin/ansible) and I(not) playbooks. See examples.
     required: false
     default: null
+  list_name:
+    description:
+      - Shell-style glob the package name must match to be listed.
+    required: false
+    default: null
+    version_added: "2.1"
+  list_arch:
+    description:
+      - Shell-style glob the package architecture must match to be listed.
+    required: false
+    default: null
+    version_added: "2.1"
+  list_repo:
+    description:
+      - Shell-style glob the repository id must match to be listed. For
+        C(list=available) and C(list=updates) only the matching repositories
+        are queried.
+    required: false
+    default: null
+    version_added: "2.1"
+  list_limit:
+    description:
+      - Maximum number of packages to list. The first ones in name order are listed.
+    required: false
+    default: null
+    version_added: "2.1"
+  list_format:
+    description:
+      - Shape of the listing. C(dicts) returns one dictionary per package.
+        C(columns) returns a single dictionary mapping each of C(name),
+        C(epoch), C(version), C(release), C(arch) and C(repo) to a list of
+        values, one per package, which is much smaller for long listings.
+    required: false
+    choices: [ "dicts", "columns" ]
+    default: "dicts"
+    version_added: "2.1"
   state:
     description:
       - Whether to install (C(present), C(latest)), or remove (C(absent)) a package.
@@ -90,6 +130,19 @@ options:
     choices: ["yes", "no"]
     aliases: []
 
+  batch:
+    description:
+      - Resolve every package in I(name) together as a single goal and
+        install or update them with one dnf transaction run from that
+        resolution, instead of handling them one at a time. Results are
+        reported per package.
+        Has an effect only if state is I(present) or I(latest).
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    aliases: []
+    version_added: "2.1"
+
 notes: []
 # informational: requirements for nodes
 requirements:
@@ -111,6 +164,9 @@ EXAMPLES = '''
 - name: upgrade all packages
   dnf: name=* state=latest
 
+- name: list at most 50 available x86_64 python packages from epel, as columns
+  dnf: list=available list_name=python* list_arch=x86_64 list_repo=epel list_limit=50 list_format=columns
+
 - name: install the nginx rpm from a remote repo
   dnf: name=http://nginx.org/packages/centos/6/noarch/RPMS/nginx-release-centos-6-0.el6.ngx.noarch.rpm state=present
 
@@ -120,6 +176,9 @@ EXAMPLES = '''
 - name: install the 'Development tools' package group
   dnf: name="@Development tools" state=present
 
+- name: bring a list of packages to their latest version in one transaction
+  dnf: name=httpd,mod_ssl,php,php-mysqlnd state=latest batch=yes
+
 '''
 
 def_qf = "%{name}-%{version}-%{release}.%{arch}"
@@ -136,7 +195,7 @@ def log(msg):
     syslog.openlog('ansible-dnf', 0, syslog.LOG_USER)
     syslog.syslog(syslog.LOG_NOTICE, msg)
 
-def dnf_base(conf_file=None, cachedir=False):
+def dnf_base(conf_file=None, cachedir=False, en_repos=None, dis_repos=None, load_available_repos=True):
 
     my = dnf.Base()
     my.conf.debuglevel=0
@@ -144,10 +203,88 @@ def dnf_base(conf_file=None, cachedir=False):
         my.conf.config_file_path = conf_file
         my.conf.read()
     my.read_all_repos()
-    my.fill_sack()
+    # repos have to be toggled before the sack is filled to take effect
+    for rid in dis_repos or []:
+        my.repos.get_matching(rid).disable()
+    for rid in en_repos or []:
+        my.repos.get_matching(rid).enable()
+    my.fill_sack(load_system_repo=True, load_available_repos=load_available_repos)
 
     return my
 
+class PackageIndex(object):
+    """
+    index of one hawkey query (installed or available packages) by name,
+    by nevra and, on first use, by provide
+    """
+
+    def __init__(self, sack, query, installed):
+        self.sack = sack
+        self.query = query
+        self.installed = installed
+        self.by_name = {}
+        self.by_nevra = {}
+        self._by_provide = None
+        for pkg in query:
+            self.by_name.setdefault(pkg.name, []).append(pkg)
+            self.by_nevra[po_to_nevra(pkg)] = pkg
+
+    def by_provide(self):
+        if self._by_provide is None:
+            self._by_provide = {}
+            for pkg in self.query:
+                for prov in pkg.provides:
+                    self._by_provide.setdefault(str(prov).split(' ')[0], []).append(pkg)
+        return self._by_provide
+
+    def match(self, spec, provides=False):
+        if spec in self.by_nevra:
+            return [self.by_nevra[spec]]
+        if spec in self.by_name:
+            return list(self.by_name[spec])
+        if provides and spec in self.by_provide():
+            return list(self.by_provide()[spec])
+        # globs, name-version(-release) forms, versioned and file provides
+        q = dnf.subject.Subject(spec).get_best_query(self.sack, with_provides=provides)
+        if self.installed:
+            return list(q.installed())
+        return list(q.available())
+
+class DnfQuery(object):
+    """
+    answers the is_installed/is_available/is_update/what_provides questions
+    for every spec of a module run from one filled dnf sack, instead of
+    spawning repoquery or re-reading the metadata once per spec
+    """
+
+    def __init__(self, base):
+        self.sack = base.sack
+        self.installed = PackageIndex(self.sack, self.sack.query().installed(), True)
+        self.available = PackageIndex(self.sack, self.sack.query().available(), False)
+        self._updates = None
+
+    def updates(self):
+        if self._updates is None:
+            self._updates = set([ po_to_nevra(p) for p in self.sack.query().upgrades() ])
+        return self._updates
+
+    def is_installed(self, pkgspec, is_pkg=False):
+        return [ po_to_nevra(p) for p in self.installed.match(pkgspec, provides=not is_pkg) ]
+
+    def is_available(self, pkgspec):
+        return [ po_to_nevra(p) for p in self.available.match(pkgspec) ]
+
+    def is_update(self, pkgspec):
+        return set([ p for p in self.is_available(pkgspec) if p in self.updates() ])
+
+    def what_provides(self, req_spec):
+        pkgs = self.available.match(req_spec, provides=True) + self.installed.match(req_spec, provides=True)
+        return set([ po_to_nevra(p) for p in pkgs ])
+
+    def provider_names(self, req_spec):
+        pkgs = self.available.match(req_spec, provides=True) + self.installed.match(req_spec, provides=True)
+        return set([ p.name for p in pkgs ])
+
 def install_dnf_utils(module):
 
     if not module.check_mode:
@@ -429,25 +566,75 @@ def repolist(module, repoq, qf="%{repoid}"):
         ret = set([ p for p in out.split('\n') if p.strip() ])
     return ret
 
-def list_stuff(module, conf_file, stuff):
+LIST_COLUMNS = ('name', 'epoch', 'version', 'release', 'arch', 'repo')
+
+def filter_pkgs(pkgstrs, name=None, arch=None, repo=None, limit=None):
+    """
+    return the n|e|v|r|a|repo lines matching the globs, without building a
+    dict for the lines that are filtered out. With a limit, the first limit
+    of them in sort order are kept while iterating, so that the same
+    packages are listed on every run.
+    """
+
+    matching = _match_pkgs(pkgstrs, name, arch, repo)
+    if limit is None:
+        return matching
+    return heapq.nsmallest(limit, matching)
+
+def _match_pkgs(pkgstrs, name, arch, repo):
+    for pkgstr in pkgstrs:
+        if not pkgstr.strip():
+            continue
+        fields = pkgstr.split('|')
+        if len(fields) == 6:
+            n,e,v,r,a,rid = fields
+            if name and not fnmatch.fnmatchcase(n, name):
+                continue
+            if arch and not fnmatch.fnmatchcase(a, arch):
+                continue
+            if repo and not fnmatch.fnmatchcase(rid, repo):
+                continue
+        yield pkgstr
+
+def format_pkgs(pkgstrs, list_format='dicts'):
+
+    if list_format == 'columns':
+        columns = dict([ (c, []) for c in LIST_COLUMNS ])
+        for pkgstr in pkgstrs:
+            fields = pkgstr.split('|')
+            if len(fields) == len(LIST_COLUMNS):
+                for c, value in zip(LIST_COLUMNS, fields):
+                    columns[c].append(value)
+        return columns
+    return [ pkg_to_dict(p) for p in pkgstrs ]
+
+def list_stuff(module, conf_file, stuff, name=None, arch=None, repo=None, limit=None, list_format='dicts'):
 
     qf = "%{name}|%{epoch}|%{version}|%{release}|%{arch}|%{repoid}"
     repoq = [repoquery, '--show-duplicates', '--plugins', '--quiet', '-q']
     if conf_file and os.path.exists(conf_file):
         repoq += ['-c', conf_file]
 
+    # let repoquery narrow by name and repo where it can
+    pkgspec = name or '-a'
+    en_repos, dis_repos = [], []
+    if repo:
+        en_repos, dis_repos = [repo], ['*']
+
     if stuff == 'installed':
-        return [ pkg_to_dict(p) for p in is_installed(module, repoq, '-a', conf_file, qf=qf) if p.strip() ]
+        pkgs = is_installed(module, repoq, pkgspec, conf_file, qf=qf, is_pkg=bool(name))
     elif stuff == 'updates':
-        return [ pkg_to_dict(p) for p in is_update(module, repoq, '-a', conf_file, qf=qf) if p.strip() ]
+        pkgs = is_update(module, repoq, pkgspec, conf_file, qf=qf, en_repos=en_repos, dis_repos=dis_repos)
     elif stuff == 'available':
-        return [ pkg_to_dict(p) for p in is_available(module, repoq, '-a', conf_file, qf=qf) if p.strip() ]
+        pkgs = is_available(module, repoq, pkgspec, conf_file, qf=qf, en_repos=en_repos, dis_repos=dis_repos)
     elif stuff == 'repos':
         return [ dict(repoid=name, state='enabled') for name in repolist(module, repoq) if name.strip() ]
     else:
-        return [ pkg_to_dict(p) for p in is_installed(module, repoq, stuff, conf_file, qf=qf) + is_available(module, repoq, stuff, conf_file, qf=qf) if p.strip() ]
+        pkgs = is_installed(module, repoq, stuff, conf_file, qf=qf) + is_available(module, repoq, stuff, conf_file, qf=qf)
+
+    return format_pkgs(filter_pkgs(pkgs, name, arch, repo, limit), list_format)
 
-def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
+def install(module, items, query, dnf_basecmd):
 
     res = {}
     res['results'] = []
@@ -468,7 +655,7 @@ def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
 
             nvra = local_nvra(module, spec)
             # look for them in the rpmdb
-            if is_installed(module, repoq, nvra, conf_file, en_repos=en_repos, dis_repos=dis_repos):
+            if query.is_installed(nvra):
                 # if they are there, skip it
                 continue
             pkg = spec
@@ -488,13 +675,13 @@ def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
             # short circuit all the bs - and search for it as a pkg in is_installed
             # if you find it then we're done
             if not set(['*','?']).intersection(set(spec)):
-                pkgs = is_installed(module, repoq, spec, conf_file, en_repos=en_repos, dis_repos=dis_repos, is_pkg=True)
+                pkgs = query.is_installed(spec, is_pkg=True)
                 if pkgs:
                     res['results'].append('%s providing %s is already installed' % (pkgs[0], spec))
                     continue
             
             # look up what pkgs provide this
-            pkglist = what_provides(module, repoq, spec, conf_file, en_repos=en_repos, dis_repos=dis_repos)
+            pkglist = query.what_provides(spec)
             if not pkglist:
                 res['msg'] += "No Package matching '%s' found available, installed or updated" % spec
                 module.fail_json(**res)
@@ -511,7 +698,7 @@ def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
 
             found = False
             for this in pkglist:
-                if is_installed(module, repoq, this, conf_file, en_repos=en_repos, dis_repos=dis_repos, is_pkg=True):
+                if query.is_installed(this, is_pkg=True):
                     found = True
                     res['results'].append('%s providing %s is already installed' % (this, spec))
                     break
@@ -522,7 +709,7 @@ def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
             # but virt provides should be all caught in what_provides on its own.
             # highly irritating
             if not found:
-                if is_installed(module, repoq, spec, conf_file, en_repos=en_repos, dis_repos=dis_repos):
+                if query.is_installed(spec):
                     found = True
                     res['results'].append('package providing %s is already installed' % (spec))
                     
@@ -571,7 +758,7 @@ def install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
     module.exit_json(**res)
 
 
-def remove(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
+def remove(module, items, query, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
 
     res = {}
     res['results'] = []
@@ -585,7 +772,7 @@ def remove(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
         if pkg.startswith('@'):
             is_group = True
         else:
-            if not is_installed(module, repoq, pkg, conf_file, en_repos=en_repos, dis_repos=dis_repos):
+            if not query.is_installed(pkg):
                 res['results'].append('%s is not installed' % pkg)
                 continue
 
@@ -610,6 +797,7 @@ def remove(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
         
         if not is_group: # we can't sensibly check for a group being uninstalled reliably
             # look to see if the pkg shows up from is_installed. If it doesn't
+            # (the in-memory query predates the transaction, so ask the rpmdb)
             if not is_installed(module, repoq, pkg, conf_file, en_repos=en_repos, dis_repos=dis_repos):
                 res['changed'] = True
             else:
@@ -620,7 +808,7 @@ def remove(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
             
     module.exit_json(**res)
 
-def latest(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
+def latest(module, items, query, dnf_basecmd):
 
     res = {}
     res['results'] = []
@@ -648,23 +836,23 @@ def latest(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
         
         # dep/pkgname  - find it
         else:
-            if is_installed(module, repoq, spec, conf_file, en_repos=en_repos, dis_repos=dis_repos):
+            if query.is_installed(spec):
                 basecmd = 'update'
             else:
                 basecmd = 'install'
 
-            pkglist = what_provides(module, repoq, spec, conf_file, en_repos=en_repos, dis_repos=dis_repos)
+            pkglist = query.what_provides(spec)
             if not pkglist:
                 res['msg'] += "No Package matching '%s' found available, installed or updated" % spec
                 module.fail_json(**res)
             
             nothing_to_do = True
             for this in pkglist:
-                if basecmd == 'install' and is_available(module, repoq, this, conf_file, en_repos=en_repos, dis_repos=dis_repos):
+                if basecmd == 'install' and query.is_available(this):
                     nothing_to_do = False
                     break
                     
-                if basecmd == 'update' and is_update(module, repoq, this, conf_file, en_repos=en_repos, dis_repos=en_repos):
+                if basecmd == 'update' and query.is_update(this):
                     nothing_to_do = False
                     break
                     
@@ -702,8 +890,129 @@ def latest(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos):
 
     module.exit_json(**res)
 
+def batch(module, items, query, base, state, disable_gpg_check=False):
+    """
+    install/update every spec as one goal, resolved and run in one dnf
+    transaction
+    """
+
+    res = {}
+    res['results'] = []
+    res['msg'] = ''
+    res['rc'] = 0
+    res['changed'] = False
+
+    # packages are marked without asking, like dnf -y
+    base.conf.assumeyes = True
+    if disable_gpg_check:
+        base.conf.gpgcheck = False
+        for repo in base.repos.iter_enabled():
+            repo.gpgcheck = False
+
+    requested = []
+    try:
+        for spec in items:
+            if spec.startswith('@'):
+                base.read_comps()
+                group = base.comps.group_by_pattern(spec[1:])
+                if group is None:
+                    res['msg'] += "No group matching '%s' found" % spec[1:]
+                    module.fail_json(**res)
+                base.group_install(group, dnf.const.GROUP_PACKAGE_TYPES)
+                res['results'].append('%s: installing group' % spec)
+                continue
+
+            if spec.endswith('.rpm') or '://' in spec:
+                if '://' not in spec and not os.path.exists(spec):
+                    res['msg'] += "No Package file matching '%s' found on system" % spec
+                    module.fail_json(**res)
+                pkg = base.add_remote_rpm(spec)
+                if query.is_installed(po_to_nevra(pkg)):
+                    res['results'].append('%s is already installed' % spec)
+                else:
+                    base.package_install(pkg)
+                    requested.append(pkg.name)
+                continue
+
+            installed = query.is_installed(spec)
+            if installed and state != 'latest':
+                res['results'].append('%s providing %s is already installed' % (installed[0], spec))
+                continue
+
+            try:
+                if installed:
+                    base.upgrade(spec)
+                else:
+                    base.install(spec)
+            except dnf.exceptions.MarkingError:
+                res['msg'] += "No Package matching '%s' found available, installed or updated" % spec
+                module.fail_json(**res)
+            requested.append(spec)
+
+        base.resolve()
+    except dnf.exceptions.DepsolveError, e:
+        res['msg'] += "Depsolve error: %s" % e
+        module.fail_json(**res)
+    except dnf.exceptions.Error, e:
+        res['msg'] += "Failure talking to dnf: %s" % e
+        module.fail_json(**res)
+
+    install_set = []
+    if base.transaction:
+        install_set = list(base.transaction.install_set)
+
+    # per package outcome of the resolution
+    for spec in requested:
+        names = query.provider_names(spec) or [spec]
+        pkgs = [ p for p in install_set if p.name in names ]
+        if not pkgs:
+            res['results'].append('All packages providing %s are up to date' % spec)
+            continue
+        for pkg in pkgs:
+            nevra = po_to_nevra(pkg)
+            if query.installed.by_name.get(pkg.name):
+                res['results'].append('%s: updating to %s' % (spec, nevra))
+            else:
+                res['results'].append('%s: installing %s' % (spec, nevra))
+
+    if not base.transaction:
+        module.exit_json(**res)
+
+    # if any of the packages are involved in a transaction, fail now
+    # so that we don't hang on the dnf operation later
+    conflicts = transaction_exists([ po_to_nevra(p) for p in install_set ])
+    if len(conflicts) > 0:
+        res['msg'] += "The following packages have pending transactions: %s" % ", ".join(conflicts)
+        module.fail_json(**res)
+
+    res['changed'] = True
+    if module.check_mode:
+        module.exit_json(**res)
+
+    # run the goal resolved above, rather than having the dnf command
+    # resolve the packages again
+    try:
+        base.download_packages(install_set)
+        if base.conf.gpgcheck:
+            for pkg in install_set:
+                code, err = base.package_signature_check(pkg)
+                if code == 1:
+                    # the key isn't imported yet, import it like dnf -y
+                    base.package_import_key(pkg)
+                    code, err = base.package_signature_check(pkg)
+                if code != 0:
+                    res['msg'] += "Failed to validate GPG signature for %s: %s" % (po_to_nevra(pkg), err)
+                    module.fail_json(**res)
+        base.do_transaction()
+    except dnf.exceptions.Error, e:
+        res['rc'] = 1
+        res['msg'] += "Failed to run the transaction: %s" % e
+        module.fail_json(**res)
+
+    module.exit_json(**res)
+
 def ensure(module, state, pkgspec, conf_file, enablerepo, disablerepo,
-           disable_gpg_check):
+           disable_gpg_check, batch_mode=False):
 
     # take multiple args comma separated
     items = pkgspec.split(',')
@@ -737,37 +1046,31 @@ def ensure(module, state, pkgspec, conf_file, enablerepo, disablerepo,
         r_cmd = ['--enablerepo=%s' % repoid]
         dnf_basecmd.extend(r_cmd)
 
-    if state in ['installed', 'present', 'latest']:
-        my = dnf_base(conf_file)
-        try:
-            for r in dis_repos:
-                my.repos.disableRepo(r)
-
-            current_repos = dnf.yum.config.RepoConf()
-            for r in en_repos:
-                try:
-                    my.repos.enableRepo(r)
-                    new_repos = my.repos.repos.keys()
-                    for i in new_repos:
-                        if not i in current_repos:
-                            rid = my.repos.getRepo(i)
-                            a = rid.repoXML.repoid
-                    current_repos = new_repos
-                except dnf.exceptions.Error, e:
-                    module.fail_json(msg="Error setting/accessing repo %s: %s" % (r, e))
-        except dnf.exceptions.Error, e:
-            module.fail_json(msg="Error accessing repos: %s" % e)
+    # one sack per run; removals only need the rpmdb
+    try:
+        my = dnf_base(conf_file, en_repos=en_repos, dis_repos=dis_repos,
+                      load_available_repos=state not in ['removed', 'absent'])
+        for r in en_repos:
+            if not my.repos.get_matching(r):
+                module.fail_json(msg="Error setting/accessing repo %s: no such repo" % r)
+        query = DnfQuery(my)
+    except dnf.exceptions.Error, e:
+        module.fail_json(msg="Error accessing repos: %s" % e)
 
     if state in ['installed', 'present']:
         if disable_gpg_check:
             dnf_basecmd.append('--nogpgcheck')
-        install(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos)
+        if batch_mode:
+            batch(module, items, query, my, state, disable_gpg_check)
+        install(module, items, query, dnf_basecmd)
     elif state in ['removed', 'absent']:
-        remove(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos)
+        remove(module, items, query, repoq, dnf_basecmd, conf_file, en_repos, dis_repos)
     elif state == 'latest':
         if disable_gpg_check:
             dnf_basecmd.append('--nogpgcheck')
-        latest(module, items, repoq, dnf_basecmd, conf_file, en_repos, dis_repos)
+        if batch_mode and '*' not in items:
+            batch(module, items, query, my, state, disable_gpg_check)
+        latest(module, items, query, dnf_basecmd)
 
     # should be caught by AnsibleModule argument_spec
     return dict(changed=False, failed=True, results='', errors='unexpected state')
@@ -793,8 +1096,14 @@ def main():
             enablerepo=dict(),
             disablerepo=dict(),
             list=dict(),
+            list_name=dict(),
+            list_arch=dict(),
+            list_repo=dict(),
+            list_limit=dict(type='int'),
+            list_format=dict(default='dicts', choices=['dicts', 'columns']),
             conf_file=dict(default=None),
             disable_gpg_check=dict(required=False, default="no", type='bool'),
+            batch=dict(required=False, default="no", type='bool'),
             # this should not be needed, but exists as a failsafe
             install_repoquery=dict(required=False, default="yes", type='bool'),
         ),
@@ -811,7 +1120,12 @@ def main():
     if not repoquery:
         module.fail_json(msg="repoquery is required to use this module at this time. Please install the yum-utils package.")
     if params['list']:
-        results = dict(results=list_stuff(module, params['conf_file'], params['list']))
+        if params['list_limit'] is not None and params['list_limit'] < 0:
+            module.fail_json(msg="list_limit must be 0 or more")
+        results = dict(results=list_stuff(module, params['conf_file'], params['list'],
+                                          params['list_name'], params['list_arch'],
+                                          params['list_repo'], params['list_limit'],
+                                          params['list_format']))
         module.exit_json(**results)
 
     else:
@@ -821,7 +1135,7 @@ def main():
         disablerepo = params.get('disablerepo', '')
         disable_gpg_check = params['disable_gpg_check']
         res = ensure(module, state, pkg, params['conf_file'], enablerepo,
-                     disablerepo, disable_gpg_check)
+                     disablerepo, disable_gpg_check, params['batch'])
         module.fail_json(msg="we should never get here unless this all failed", **res)
 
 # import module snippets
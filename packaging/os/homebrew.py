@@ -73,6 +73,7 @@ EXAMPLES = '''
 - homebrew: name=foo state=present install_options=with-baz,enable-debug
 '''
 
+import json
 import os.path
 import re
 
@@ -328,6 +329,7 @@ class Homebrew(object):
     def _prep(self):
         self._prep_path()
         self._prep_brew_path()
+        self._prep_inventory()
 
     def _prep_path(self):
         if not self.path:
@@ -353,6 +355,12 @@ class Homebrew(object):
 
         return self.brew_path
 
+    def _prep_inventory(self):
+        # loaded on first use, see _inventory()
+        self._installed = None
+        self._outdated = None
+        self._inventory_loaded = False
+
     def _status(self):
         return (self.failed, self.changed, self.message)
     # /prep -------------------------------------------------------- }}}
@@ -372,6 +380,88 @@ class Homebrew(object):
 
         return (failed, changed, message)
 
+    # inventory ---------------------------------------------------- {{{
+    def _index_formula(self, formula):
+        names = [formula['name'], formula.get('full_name')]
+        names.extend(formula.get('aliases') or [])
+        for name in names:
+            if name:
+                self._installed[name] = formula
+
+    def _inventory(self):
+        '''
+        Installed formulae indexed by name, full name and alias, from a single
+        `brew info --json=v1 --installed` call, plus a single `brew outdated`
+        call. Returns None when this brew cannot produce a JSON inventory, in
+        which case the per-package checks fall back to `brew info`.
+        '''
+
+        if self._inventory_loaded:
+            return self._installed
+        self._inventory_loaded = True
+
+        rc, out, err = self.module.run_command([
+            self.brew_path,
+            'info',
+            '--json=v1',
+            '--installed',
+        ])
+        try:
+            formulae = json.loads(out)
+        except ValueError:
+            return None
+        if rc != 0 or not isinstance(formulae, list):
+            return None
+
+        self._installed = {}
+        for formula in formulae:
+            if formula.get('installed'):
+                self._index_formula(formula)
+        self._outdated = set(self._outdated_packages())
+
+        return self._installed
+
+    def _current_formula(self):
+        return self._installed.get(self.current_package)
+
+    def _refresh_current_package(self, upgraded=False):
+        '''Re-read the current package into the inventory after a change.'''
+
+        if self._inventory() is None:
+            return
+
+        rc, out, err = self.module.run_command([
+            self.brew_path,
+            'info',
+            '--json=v1',
+            self.current_package,
+        ])
+        try:
+            formula = json.loads(out)[0]
+        except (ValueError, IndexError, KeyError):
+            formula = None
+
+        stale = self._current_formula()
+        if stale is not None:
+            for name, indexed in self._installed.items():
+                if indexed is stale:
+                    del self._installed[name]
+
+        if formula is None:
+            return
+        if formula.get('installed'):
+            self._index_formula(formula)
+        if 'outdated' in formula:
+            if formula['outdated']:
+                self._outdated.add(formula['name'])
+            else:
+                self._outdated.discard(formula['name'])
+                self._outdated.discard(self.current_package)
+        elif upgraded or not formula.get('installed'):
+            self._outdated.discard(formula['name'])
+            self._outdated.discard(self.current_package)
+    # /inventory --------------------------------------------------- }}}
+
     # checks ------------------------------------------------------- {{{
     def _current_package_is_installed(self):
         if not self.valid_package(self.current_package):
@@ -379,6 +469,9 @@ class Homebrew(object):
             self.message = 'Invalid package: {0}.'.format(self.current_package)
             raise HomebrewException(self.message)
 
+        if self._inventory() is not None:
+            return self._current_formula() is not None
+
         cmd = [
             "{brew_path}".format(brew_path=self.brew_path),
             "info",
@@ -405,6 +498,13 @@ class Homebrew(object):
         if not self.valid_package(self.current_package):
             return False
 
+        if self._inventory() is not None:
+            formula = self._current_formula()
+            return (
+                self.current_package in self._outdated
+                or (formula is not None and formula['name'] in self._outdated)
+            )
+
         return self.current_package in self._outdated_packages()
 
     def _current_package_is_installed_from_head(self):
@@ -413,6 +513,12 @@ class Homebrew(object):
         elif not self._current_package_is_installed():
             return False
 
+        if self._inventory() is not None:
+            return any(
+                'HEAD' in keg.get('version', '')
+                for keg in self._current_formula()['installed']
+            )
+
         rc, out, err = self.module.run_command([
             self.brew_path,
             'info',
@@ -529,6 +635,7 @@ class Homebrew(object):
         )
         cmd = [opt for opt in opts if opt]
         rc, out, err = self.module.run_command(cmd)
+        self._refresh_current_package()
 
         if self._current_package_is_installed():
             self.changed_count += 1
@@ -581,6 +688,7 @@ class Homebrew(object):
         )
         cmd = [opt for opt in opts if opt]
         rc, out, err = self.module.run_command(cmd)
+        self._refresh_current_package(upgraded=rc == 0)
 
         if self._current_package_is_installed() and not self._current_package_is_outdated():
             self.changed_count += 1
@@ -647,6 +755,7 @@ class Homebrew(object):
         )
         cmd = [opt for opt in opts if opt]
         rc, out, err = self.module.run_command(cmd)
+        self._refresh_current_package()
 
         if not self._current_package_is_installed():
             self.changed_count += 1